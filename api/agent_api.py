@@ -6,7 +6,7 @@ FastAPI server exposing agent endpoints for customer analysis and metrics
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import sys
@@ -22,6 +22,8 @@ try:
     from src.memory import MemoryManager
     from src.logger import get_logger
     from src.validators import CustomerNotFoundError
+    from src.schemas import CustomerId
+    from src.constants import MAX_BATCH_SIZE
 except ImportError:
     print("Error: Could not import required modules. Make sure all Phase 1 components are complete.")
     sys.exit(1)
@@ -77,15 +79,8 @@ error_count = 0
 
 class AnalyzeRequest(BaseModel):
     """Request model for customer analysis"""
-    customer_id: str = Field(..., description="Unique customer identifier")
+    customer_id: CustomerId = Field(..., description="Unique customer identifier")
     include_history: bool = Field(default=False, description="Include past recommendations in response")
-    
-    @field_validator('customer_id')
-    @classmethod
-    def validate_customer_id(cls, v):
-        if not v or not v.strip():
-            raise ValueError("customer_id cannot be empty")
-        return v.strip()
 
 
 class AnalyzeResponse(BaseModel):
@@ -100,6 +95,20 @@ class AnalyzeResponse(BaseModel):
     history: Optional[List[Dict[str, Any]]] = None
 
 
+class BatchAnalyzeRequest(BaseModel):
+    """Request model for batch customer analysis"""
+    customer_ids: List[CustomerId] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE, description="Customer identifiers to analyze"
+    )
+
+
+class BatchAnalyzeResponse(BaseModel):
+    """Response model for batch customer analysis"""
+    results: List[AnalyzeResponse]
+    count: int
+    timestamp: str
+
+
 class HealthResponse(BaseModel):
     """Response model for health check"""
     status: str
@@ -164,6 +173,7 @@ def get_agent_metadata() -> Dict[str, Any]:
         ],
         "endpoints": {
             "analyze": "/analyze",
+            "analyze_batch": "/analyze_batch",
             "health": "/health",
             "metrics": "/metrics"
         },
@@ -186,6 +196,7 @@ async def root():
         "documentation": "/docs",
         "endpoints": {
             "analyze": "POST /analyze",
+            "analyze_batch": "POST /analyze_batch",
             "health": "GET /health",
             "metrics": "GET /metrics",
             "register": "POST /register"
@@ -258,6 +269,61 @@ async def analyze_customer(request: AnalyzeRequest):
         )
 
 
+@app.post("/analyze_batch", response_model=BatchAnalyzeResponse, summary="Analyze many customers in one request")
+async def analyze_customers_batch(request: BatchAnalyzeRequest):
+    """
+    Analyze several customers in one round-trip
+    
+    - **customer_ids**: Customer identifiers (1 to MAX_BATCH_SIZE)
+    
+    Returns one /analyze-shaped result per customer, in request order.
+    Batch results are not written to recommendation memory.
+    """
+    global request_count, error_count
+    request_count += 1
+    
+    if not agent:
+        error_count += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Agent is not initialized. Service temporarily unavailable."
+        )
+    
+    try:
+        logger.info(f"Batch analyzing {len(request.customer_ids)} customers")
+        analyses = agent.batch_analyze(request.customer_ids)
+        
+        timestamp = datetime.now().isoformat()
+        results = [
+            AnalyzeResponse(
+                customer_id=analysis["customer_id"],
+                recommended_reward=analysis["recommendation"]["recommended_reward"],
+                predicted_retention=1 - analysis["churn_prediction"]["probability"],
+                segment=analysis["segmentation"]["detailed_segment"],
+                rfm_score=analysis["rfm_analysis"]["rfm_score"],
+                churn_risk=analysis["churn_prediction"]["risk_level"],
+                timestamp=timestamp
+            )
+            for analysis in analyses
+        ]
+        return BatchAnalyzeResponse(results=results, count=len(results), timestamp=timestamp)
+        
+    except CustomerNotFoundError as e:
+        error_count += 1
+        logger.warning(f"Batch analysis failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        error_count += 1
+        logger.error(f"Error during batch analysis: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal error: {str(e)}"
+        )
+
+
 @app.get("/health", response_model=HealthResponse, summary="Health check endpoint")
 async def health_check():
     """
@@ -0,0 +1,20 @@
+"""
+Shared pytest configuration for the Phase 1 test scripts
+"""
+
+import pytest
+
+from src.loyalty_agent import LoyaltyAgent
+
+
+def pytest_configure(config):
+    """Register custom markers"""
+    # Reason: tests sharing the session agent are grouped onto one pytest-xdist worker
+    # (run with `pytest -n auto --dist loadgroup`); registering keeps plain pytest warning-free
+    config.addinivalue_line("markers", "xdist_group(name): run tests in the same pytest-xdist worker")
+
+
+@pytest.fixture(scope="session")
+def agent():
+    """Build the Loyalty Agent once per pytest session (JSON load + indexes)"""
+    return LoyaltyAgent()
@@ -0,0 +1,124 @@
+"""
+Result caches for the Loyalty Agent
+Per-customer memos and sampled analysis caching, valid for the data and calendar day they were computed on
+"""
+
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+try:
+    from src.validators import validate_customer_id
+    from src.customer_arrays import CustomerArrays
+except ImportError:
+    from validators import validate_customer_id
+    from customer_arrays import CustomerArrays
+
+
+class AgentCache:
+    """Memoized per-customer results, cached analyses and the bulk churn column"""
+
+    def __init__(self):
+        """Initialize empty caches for today"""
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every cached result and restart analysis sampling"""
+        self.day = date.today()
+        self.memos: Dict[str, Dict[str, Any]] = {}
+        self.analyses: Dict[str, Dict[str, Any]] = {}
+        self.all_churn: Optional[np.ndarray] = None
+        self._acc = 0.0
+
+    def refresh(self) -> None:
+        """Drop results computed on an earlier day"""
+        # Reason: recency is measured from today, so RFM, churn, segment, reward and analysis results expire daily
+        if date.today() != self.day:
+            self.clear()
+
+    def memo(self, name: str) -> Dict[str, Any]:
+        """
+        Today's memo table for one per-customer computation
+
+        Args:
+            name: Computation name
+
+        Returns:
+            Dictionary of customer ID -> result
+        """
+        self.refresh()
+        return self.memos.setdefault(name, {})
+
+    def churn(self, arrays: CustomerArrays) -> np.ndarray:
+        """
+        Today's churn probabilities for every customer, computed once
+
+        Args:
+            arrays: Columnar customer data
+
+        Returns:
+            float64 array row-aligned with the customers
+        """
+        self.refresh()
+        if self.all_churn is None:
+            self.all_churn = arrays.churn_probabilities()
+        return self.all_churn
+
+    def get_analysis(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached analysis
+
+        Args:
+            customer_id: Customer identifier
+
+        Returns:
+            Copy of the cached analysis stamped with the current time, or None
+        """
+        self.refresh()
+        cached = self.analyses.get(customer_id)
+        if cached is None:
+            return None
+        return {**cached, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+    def offer_analysis(self, customer_id: str, analysis: Dict[str, Any], cache_rate: float) -> None:
+        """
+        Cache a fresh analysis for a cache_rate fraction of calls
+
+        Args:
+            customer_id: Customer identifier
+            analysis: Result of LoyaltyAgent.analyze_customer
+            cache_rate: Fraction of analyses to keep (0-1)
+        """
+        # Reason: deterministic probabilistic caching - every 1/cache_rate-th analysis is kept,
+        # so full scans cannot grow the cache unboundedly while repeatedly analyzed customers
+        # are cached after a few touches
+        self._acc += cache_rate
+        if self._acc >= 1.0:
+            self._acc -= 1.0
+            self.analyses[customer_id] = analysis
+
+
+def memoized(name: str) -> Callable:
+    """
+    Memoize a per-customer LoyaltyAgent method in the agent's AgentCache
+
+    The wrapped method receives a validated customer ID; lookups that raise are not cached.
+
+    Args:
+        name: Memo table name
+
+    Returns:
+        Method decorator
+    """
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(agent, customer_id: str):
+            customer_id = validate_customer_id(customer_id)
+            memo = agent._cache.memo(name)
+            if customer_id not in memo:
+                memo[customer_id] = method(agent, customer_id)
+            return memo[customer_id]
+        return wrapper
+    return decorator
@@ -66,6 +66,12 @@ MAX_RETENTION_LIFT = 0.30  # Maximum 30% retention improvement
 HIGH_VALUE_CHURN_THRESHOLD = 0.6
 HIGH_VALUE_MIN_LTV = 50000  # PKR
 
+# Fraction of analyze_customer results kept in the analysis cache
+ANALYSIS_CACHE_RATE = 0.3
+
 # Default file paths
 DEFAULT_CUSTOMERS_FILE = "data/customers.json"
 DEFAULT_TRANSACTIONS_FILE = "data/transactions.json"
+
+# Maximum customer IDs accepted by one POST /analyze_batch request
+MAX_BATCH_SIZE = 500
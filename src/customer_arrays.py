@@ -0,0 +1,190 @@
+"""
+Columnar (structure-of-arrays) view of customer data
+Lets the Loyalty Agent score many customers in single vectorized NumPy passes
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from src.constants import (
+        RFM_RECENCY_DECAY_DAYS, RFM_MAX_FREQUENCY, RFM_MAX_LTV,
+        RFM_WEIGHT_RECENCY, RFM_WEIGHT_FREQUENCY, RFM_WEIGHT_MONETARY,
+        CHURN_RECENCY_RECENT, CHURN_RECENCY_MODERATE, CHURN_RECENCY_OLD,
+        CHURN_WEIGHT_RECENCY, CHURN_WEIGHT_FREQUENCY, CHURN_WEIGHT_ENGAGEMENT, CHURN_WEIGHT_RFM,
+        FREQUENCY_HIGH, FREQUENCY_MEDIUM, FREQUENCY_LOW
+    )
+    from src.validators import CustomerNotFoundError
+except ImportError:
+    from constants import (
+        RFM_RECENCY_DECAY_DAYS, RFM_MAX_FREQUENCY, RFM_MAX_LTV,
+        RFM_WEIGHT_RECENCY, RFM_WEIGHT_FREQUENCY, RFM_WEIGHT_MONETARY,
+        CHURN_RECENCY_RECENT, CHURN_RECENCY_MODERATE, CHURN_RECENCY_OLD,
+        CHURN_WEIGHT_RECENCY, CHURN_WEIGHT_FREQUENCY, CHURN_WEIGHT_ENGAGEMENT, CHURN_WEIGHT_RFM,
+        FREQUENCY_HIGH, FREQUENCY_MEDIUM, FREQUENCY_LOW
+    )
+    from validators import CustomerNotFoundError
+
+# Record layout returned by LoyaltyAgent.calculate_rfm_scores_bulk
+RFM_DTYPE = np.dtype([
+    ("recency", np.float32),
+    ("frequency", np.float32),
+    ("monetary", np.float32),
+    ("rfm_score", np.float32)
+])
+
+
+class CustomerArrays:
+    """NumPy columns for every customer, row-aligned with the agent's customer list"""
+
+    def __init__(self, customers: List[Dict], transactions: List[Dict]):
+        """
+        Build the columns from customer and transaction records
+
+        Args:
+            customers: Customer profile dictionaries
+            transactions: Transaction dictionaries
+        """
+        count = len(customers)
+        self.customer_ids = [c['customer_id'] for c in customers]
+        self.position: Dict[str, int] = {cid: i for i, cid in enumerate(self.customer_ids)}
+
+        self.last_purchase_ordinal = np.fromiter(
+            (date.fromisoformat(c['last_purchase_date']).toordinal() for c in customers),
+            dtype=np.int64, count=count
+        )
+        self.total_purchases = np.fromiter((c['total_purchases'] for c in customers), dtype=np.float64, count=count)
+        self.lifetime_value = np.fromiter((c['lifetime_value'] for c in customers), dtype=np.float64, count=count)
+        self.purchase_frequency = np.fromiter(
+            (c['purchase_frequency'] for c in customers), dtype=np.float64, count=count
+        )
+        self.engagement_score = np.fromiter((c['engagement_score'] for c in customers), dtype=np.float64, count=count)
+
+        # Completed transactions per customer (RFM is zero for customers without any)
+        completed = np.fromiter(
+            (self.position.get(t['customer_id'], -1) for t in transactions if t['status'] == 'Completed'),
+            dtype=np.int64
+        )
+        self.completed_counts = np.bincount(completed[completed >= 0], minlength=count)
+
+    def completed_count(self, customer_id: str) -> int:
+        """
+        Number of completed transactions for one customer
+
+        Args:
+            customer_id: Customer identifier
+
+        Returns:
+            Completed transaction count (0 for unknown customers)
+        """
+        position = self.position.get(customer_id)
+        return 0 if position is None else int(self.completed_counts[position])
+
+    def positions(self, customer_ids: List[str]) -> np.ndarray:
+        """
+        Map customer IDs to row positions
+
+        Args:
+            customer_ids: Customer identifiers
+
+        Returns:
+            Integer array of row positions
+
+        Raises:
+            KeyError: If a customer ID is unknown
+        """
+        position = self.position
+        return np.fromiter((position[cid] for cid in customer_ids), dtype=np.intp, count=len(customer_ids))
+
+    def rfm_records(self, customer_ids: List[str]) -> np.ndarray:
+        """
+        RFM scores as records for LoyaltyAgent.calculate_rfm_scores_bulk
+
+        Args:
+            customer_ids: Validated customer identifiers
+
+        Returns:
+            Structured RFM_DTYPE array, one record per customer
+
+        Raises:
+            CustomerNotFoundError: If a customer ID is unknown
+        """
+        try:
+            positions = self.positions(customer_ids)
+        except KeyError as e:
+            raise CustomerNotFoundError(f"Customer not found: {e.args[0]}")
+        result = np.empty(len(positions), dtype=RFM_DTYPE)
+        for field, values in zip(RFM_DTYPE.names, self.rfm_scores(positions)):
+            result[field] = values
+        return result
+
+    def rfm_scores(self, positions: np.ndarray,
+                   today_ordinal: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized equivalent of LoyaltyAgent.calculate_rfm_score
+
+        Args:
+            positions: Row positions to score
+            today_ordinal: Date ordinal to measure recency from (defaults to today)
+
+        Returns:
+            Tuple of float64 arrays (recency, frequency, monetary, rfm_score), rounded to 2 decimals
+        """
+        if today_ordinal is None:
+            today_ordinal = date.today().toordinal()
+
+        recency_days = today_ordinal - self.last_purchase_ordinal[positions]
+        recency = np.maximum(0, 100 - (recency_days / RFM_RECENCY_DECAY_DAYS))
+        frequency = np.minimum(100, (self.total_purchases[positions] / RFM_MAX_FREQUENCY) * 100)
+        monetary = np.minimum(100, (self.lifetime_value[positions] / RFM_MAX_LTV) * 100)
+        rfm_score = (recency * RFM_WEIGHT_RECENCY +
+                     frequency * RFM_WEIGHT_FREQUENCY +
+                     monetary * RFM_WEIGHT_MONETARY)
+
+        has_purchases = self.completed_counts[positions] > 0
+        return tuple(
+            np.where(has_purchases, np.round(values, 2), 0.0)
+            for values in (recency, frequency, monetary, rfm_score)
+        )
+
+    def churn_probabilities(self, today_ordinal: Optional[int] = None) -> np.ndarray:
+        """
+        Vectorized equivalent of LoyaltyAgent.predict_churn_probability for every customer
+
+        Args:
+            today_ordinal: Date ordinal to measure recency from (defaults to today)
+
+        Returns:
+            float64 array of churn probabilities, rounded to 3 decimals
+        """
+        if today_ordinal is None:
+            today_ordinal = date.today().toordinal()
+
+        days_since_purchase = today_ordinal - self.last_purchase_ordinal
+        recency_risk = np.select(
+            [days_since_purchase < CHURN_RECENCY_RECENT,
+             days_since_purchase < CHURN_RECENCY_MODERATE,
+             days_since_purchase < CHURN_RECENCY_OLD],
+            [0.1, 0.3, 0.6], default=0.9
+        )
+
+        frequency = self.purchase_frequency
+        frequency_risk = np.select(
+            [frequency > FREQUENCY_HIGH, frequency > FREQUENCY_MEDIUM, frequency > FREQUENCY_LOW],
+            [0.1, 0.3, 0.5], default=0.8
+        )
+
+        engagement_risk = 1 - (self.engagement_score / 100)
+
+        rfm_score = self.rfm_scores(np.arange(len(self.customer_ids)), today_ordinal)[3]
+        rfm_risk = 1 - (rfm_score / 100)
+
+        churn_probability = (
+            recency_risk * CHURN_WEIGHT_RECENCY +
+            frequency_risk * CHURN_WEIGHT_FREQUENCY +
+            engagement_risk * CHURN_WEIGHT_ENGAGEMENT +
+            rfm_risk * CHURN_WEIGHT_RFM
+        )
+        return np.round(np.minimum(1.0, churn_probability), 3)
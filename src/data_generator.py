@@ -3,12 +3,15 @@ Data Generator for Loyalty AI Agent
 Generates synthetic customer profiles and transaction data for testing and demonstration
 """
 
-import json
 import random
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 import numpy as np
+import orjson
+
+# Indented like the previous json.dump(indent=2) output; NumPy scalars serialize natively
+JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
 
 
 class CustomerDataGenerator:
@@ -288,14 +291,14 @@ class CustomerDataGenerator:
 
         # Save customers
         customers_file = output_path / "customers.json"
-        with open(customers_file, 'w') as f:
-            json.dump(customers, f, indent=2)
+        with open(customers_file, 'wb') as f:
+            f.write(orjson.dumps(customers, option=JSON_OPTIONS))
         print(f"✓ Saved {len(customers)} customers to {customers_file}")
 
         # Save transactions
         transactions_file = output_path / "transactions.json"
-        with open(transactions_file, 'w') as f:
-            json.dump(transactions, f, indent=2)
+        with open(transactions_file, 'wb') as f:
+            f.write(orjson.dumps(transactions, option=JSON_OPTIONS))
         print(f"✓ Saved {len(transactions)} transactions to {transactions_file}")
 
         # Generate summary statistics
@@ -3,11 +3,13 @@ Loyalty AI Agent - Core Logic
 Implements customer segmentation, reward optimization, and churn prediction
 """
 
-import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
+import numpy as np
+import orjson
+
 try:
     from src.constants import (
         REWARD_CATALOG, RFM_RECENCY_DECAY_DAYS, RFM_MAX_FREQUENCY, RFM_MAX_LTV,
@@ -18,10 +20,12 @@ try:
         FREQUENCY_LOW, ENGAGEMENT_HIGH, ENGAGEMENT_MEDIUM, RFM_CHAMPION_THRESHOLD,
         RFM_LOYAL_THRESHOLD, RFM_POTENTIAL_THRESHOLD, NEW_CUSTOMER_PURCHASE_LIMIT,
         MAX_RETENTION_LIFT, HIGH_VALUE_CHURN_THRESHOLD, HIGH_VALUE_MIN_LTV,
-        DEFAULT_CUSTOMERS_FILE, DEFAULT_TRANSACTIONS_FILE
+        ANALYSIS_CACHE_RATE, DEFAULT_CUSTOMERS_FILE, DEFAULT_TRANSACTIONS_FILE
     )
     from src.validators import validate_customer_id, validate_probability, validate_limit, CustomerNotFoundError
     from src.logger import get_logger
+    from src.customer_arrays import CustomerArrays
+    from src.agent_cache import AgentCache, memoized
 except ImportError:
     from constants import (
         REWARD_CATALOG, RFM_RECENCY_DECAY_DAYS, RFM_MAX_FREQUENCY, RFM_MAX_LTV,
@@ -32,41 +36,53 @@ except ImportError:
         FREQUENCY_LOW, ENGAGEMENT_HIGH, ENGAGEMENT_MEDIUM, RFM_CHAMPION_THRESHOLD,
         RFM_LOYAL_THRESHOLD, RFM_POTENTIAL_THRESHOLD, NEW_CUSTOMER_PURCHASE_LIMIT,
         MAX_RETENTION_LIFT, HIGH_VALUE_CHURN_THRESHOLD, HIGH_VALUE_MIN_LTV,
-        DEFAULT_CUSTOMERS_FILE, DEFAULT_TRANSACTIONS_FILE
+        ANALYSIS_CACHE_RATE, DEFAULT_CUSTOMERS_FILE, DEFAULT_TRANSACTIONS_FILE
     )
     from validators import validate_customer_id, validate_probability, validate_limit, CustomerNotFoundError
     from logger import get_logger
+    from customer_arrays import CustomerArrays
+    from agent_cache import AgentCache, memoized
 
 
 class LoyaltyAgent:
     """AI Agent for customer loyalty optimization with RFM analysis and personalized recommendations"""
 
     def __init__(self, customers_file: str = DEFAULT_CUSTOMERS_FILE,
-                 transactions_file: str = DEFAULT_TRANSACTIONS_FILE):
-        """Initialize Loyalty Agent and load data"""
+                 transactions_file: str = DEFAULT_TRANSACTIONS_FILE,
+                 cache_rate: float = ANALYSIS_CACHE_RATE,
+                 customers: Optional[List[Dict]] = None,
+                 transactions: Optional[List[Dict]] = None):
+        """Initialize Loyalty Agent and load data
+
+        cache_rate is the fraction of analyze_customer results kept in the analysis cache.
+        Passing customers and/or transactions uses those records directly instead of reading the files.
+        """
         self.logger = get_logger(__name__)
         self.customers_file = customers_file
         self.transactions_file = transactions_file
-        self.customers: List[Dict] = []
-        self.transactions: List[Dict] = []
+        self.cache_rate = validate_probability(cache_rate, "cache_rate")
+        self.customers: List[Dict] = customers or []
+        self.transactions: List[Dict] = transactions or []
         # O(1) lookup indexes
         self.customer_index: Dict[str, Dict] = {}
         self.transaction_index: Dict[str, List[Dict]] = {}
-        self._load_data()
+
+        self._in_memory = customers is not None or transactions is not None
+        self.reload_data()
 
     def _load_data(self) -> None:
         """Load customer and transaction data from JSON files and build indexes"""
         try:
             customers_path = Path(self.customers_file)
             if customers_path.exists():
-                with open(customers_path, 'r') as f:
-                    self.customers = json.load(f)
+                with open(customers_path, 'rb') as f:
+                    self.customers = orjson.loads(f.read())
                 self.logger.info(f"Loaded {len(self.customers)} customers")
 
             transactions_path = Path(self.transactions_file)
             if transactions_path.exists():
-                with open(transactions_path, 'r') as f:
-                    self.transactions = json.load(f)
+                with open(transactions_path, 'rb') as f:
+                    self.transactions = orjson.loads(f.read())
                 self.logger.info(f"Loaded {len(self.transactions)} transactions")
 
             # Build indexes for O(1) lookups
@@ -75,6 +91,13 @@ class LoyaltyAgent:
             self.logger.error(f"Error loading data: {e}")
             raise
 
+    def reload_data(self) -> None:
+        """Reload customer and transaction data from disk and drop every cached result (in-memory agents keep their records)"""
+        if self._in_memory:
+            self._build_indexes()
+        else:
+            self._load_data()
+
     def _build_indexes(self) -> None:
         """Build customer and transaction indexes for O(1) lookups"""
         # Build customer index
@@ -83,31 +106,31 @@ class LoyaltyAgent:
         # Build transaction index (group by customer_id)
         self.transaction_index = {}
         for txn in self.transactions:
-            customer_id = txn['customer_id']
-            if customer_id not in self.transaction_index:
-                self.transaction_index[customer_id] = []
-            self.transaction_index[customer_id].append(txn)
+            self.transaction_index.setdefault(txn['customer_id'], []).append(txn)
+
+        # Columnar view for vectorized bulk scoring
+        self._arrays = CustomerArrays(self.customers, self.transactions)
+        self.customer_segments = np.array([c['segment'] for c in self.customers])
+        self.customer_tiers = np.array([c['loyalty_tier'] for c in self.customers])
+
+        # Result caches; rebuilt with the indexes so they never outlive the data
+        self._cache = AgentCache()
 
     def _get_customer(self, customer_id: str) -> Optional[Dict]:
         """Get customer by ID using O(1) index lookup"""
         return self.customer_index.get(customer_id)
 
-    def _get_customer_transactions(self, customer_id: str) -> List[Dict]:
-        """Get completed transactions for a customer using O(1) index lookup"""
-        txns = self.transaction_index.get(customer_id, [])
-        return [t for t in txns if t['status'] == 'Completed']
-
+    @memoized("rfm")
     def calculate_rfm_score(self, customer_id: str) -> Dict[str, float]:
         """Calculate RFM (Recency, Frequency, Monetary) score"""
-        customer_id = validate_customer_id(customer_id)
         customer = self._get_customer(customer_id)
 
         if not customer:
             self.logger.warning(f"Customer not found: {customer_id}")
             raise CustomerNotFoundError(f"Customer not found: {customer_id}")
 
-        customer_txns = self._get_customer_transactions(customer_id)
-        if not customer_txns:
+        # Reason: only the presence of completed transactions matters here, and it is precounted
+        if not self._arrays.completed_count(customer_id):
             return {"recency": 0, "frequency": 0, "monetary": 0, "rfm_score": 0}
 
         # Recency: days since last purchase (lower is better)
@@ -138,9 +161,24 @@ class LoyaltyAgent:
             "lifetime_value": round(monetary, 2)
         }
 
+    def calculate_rfm_scores_bulk(self, customer_ids: List[str]) -> np.ndarray:
+        """Calculate RFM scores for many customers in one vectorized pass
+
+        Returns a structured float32 array with fields recency, frequency, monetary and rfm_score
+        """
+        return self._arrays.rfm_records([validate_customer_id(cid) for cid in customer_ids])
+
+    def compute_all_churn(self) -> np.ndarray:
+        """Churn probability for every customer (row-aligned with self.customers), computed once per day"""
+        return self._cache.churn(self._arrays)
+
+    def compute_all_ltv(self) -> np.ndarray:
+        """Lifetime value for every customer (row-aligned with self.customers)"""
+        return self._arrays.lifetime_value
+
+    @memoized("churn")
     def predict_churn_probability(self, customer_id: str) -> float:
         """Predict churn probability using multi-factor analysis"""
-        customer_id = validate_customer_id(customer_id)
         customer = self._get_customer(customer_id)
 
         if not customer:
@@ -188,9 +226,9 @@ class LoyaltyAgent:
 
         return round(min(1.0, churn_probability), 3)
 
+    @memoized("segment")
     def segment_customer(self, customer_id: str) -> Dict[str, Any]:
         """Perform advanced customer segmentation"""
-        customer_id = validate_customer_id(customer_id)
         customer = self._get_customer(customer_id)
 
         if not customer:
@@ -245,9 +283,9 @@ class LoyaltyAgent:
         return [("premium_discount", 0.9), ("gift_voucher", 0.85),
                ("cashback", 0.8)], "Win-Back Campaign"
 
+    @memoized("reward")
     def recommend_reward(self, customer_id: str) -> Dict[str, Any]:
         """Recommend personalized reward/incentive using multi-armed bandit approach"""
-        customer_id = validate_customer_id(customer_id)
         customer = self._get_customer(customer_id)
 
         if not customer:
@@ -300,6 +338,9 @@ class LoyaltyAgent:
     def analyze_customer(self, customer_id: str) -> Dict[str, Any]:
         """Comprehensive customer analysis combining all insights"""
         customer_id = validate_customer_id(customer_id)
+        cached = self._cache.get_analysis(customer_id)
+        if cached is not None:
+            return cached
         customer = self._get_customer(customer_id)
 
         if not customer:
@@ -314,7 +355,7 @@ class LoyaltyAgent:
         self.logger.info(f"Analyzed customer {customer_id}: segment={segmentation['detailed_segment']}, "
                         f"churn={churn_prediction}")
 
-        return {
+        analysis = {
             "customer_id": customer_id,
             "profile": {
                 "segment": customer['segment'],
@@ -341,6 +382,9 @@ class LoyaltyAgent:
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
+        self._cache.offer_analysis(customer_id, analysis, self.cache_rate)
+        return analysis
+
     def optimize_loyalty(self, customer_id: str) -> Dict[str, Any]:
         """
         Main optimization method that returns simplified recommendations for API
@@ -389,16 +433,15 @@ class LoyaltyAgent:
         threshold = validate_probability(threshold, "threshold")
         min_ltv = validate_probability(min_ltv, "min_ltv") if min_ltv <= 1 else min_ltv
 
-        at_risk_customers = []
+        # Reason: filter every customer in one vectorized pass and only analyze the survivors; vectorized rounding
+        # can differ in the last digit, so the mask keeps a margin and candidates are confirmed with the scalar path
+        candidates = (self.compute_all_ltv() >= min_ltv) & (self.compute_all_churn() >= threshold - 1e-3)
 
-        for customer in self.customers:
-            if customer['lifetime_value'] >= min_ltv:
-                customer_id = customer['customer_id']
-                churn_prob = self.predict_churn_probability(customer_id)
-
-                if churn_prob >= threshold:
-                    analysis = self.analyze_customer(customer_id)
-                    at_risk_customers.append(analysis)
+        at_risk_customers = []
+        for position in np.flatnonzero(candidates):
+            customer_id = self._arrays.customer_ids[position]
+            if self.predict_churn_probability(customer_id) >= threshold:
+                at_risk_customers.append(self.analyze_customer(customer_id))
 
         at_risk_customers.sort(key=lambda x: x['kpis']['lifetime_value'], reverse=True)
 
@@ -5,15 +5,26 @@ Handles agent registration, heartbeat, and inter-agent communication
 
 import json
 import requests
+import socket
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from threading import Thread, Event
+from typing import Dict, Any, Optional, List, Tuple
 import time
 
 try:
     from src.logger import get_logger
+    from src.registry_transport import (
+        shared_session, encode_heartbeat, msgpack, open_udp_socket, request_json, post_concurrently,
+        CircuitBreaker, HeartbeatConnection, PeriodicJob, SharedScheduler
+    )
 except ImportError:
     from logger import get_logger
+    from registry_transport import (
+        shared_session, encode_heartbeat, msgpack, open_udp_socket, request_json, post_concurrently,
+        CircuitBreaker, HeartbeatConnection, PeriodicJob, SharedScheduler
+    )
+
+# One heap scheduler on one daemon thread drives every client's heartbeats
+_GLOBAL_HB = SharedScheduler()
 
 
 class RegistryClient:
@@ -28,7 +39,9 @@ class RegistryClient:
                  agent_type: str = "loyalty_optimization",
                  version: str = "1.0.0",
                  api_host: str = "localhost",
-                 api_port: int = 8000):
+                 api_port: int = 8000,
+                 heartbeat_format: str = "json",
+                 udp_heartbeat_port: Optional[int] = None):
         """
         Initialize Registry Client
         
@@ -39,6 +52,8 @@ class RegistryClient:
             version: Agent version
             api_host: Host where this agent's API is running
             api_port: Port where this agent's API is running
+            heartbeat_format: Heartbeat wire format, "json" or "msgpack"
+            udp_heartbeat_port: Supervisor UDP port for best-effort heartbeats (TCP if None)
         """
         self.logger = get_logger(__name__)
         
@@ -58,11 +73,27 @@ class RegistryClient:
         
         # Heartbeat mechanism
         self.heartbeat_interval = 30  # seconds
-        self.heartbeat_thread: Optional[Thread] = None
-        self.heartbeat_stop_event = Event()
+        self._hb_conn: Optional[HeartbeatConnection] = None
+        self._hb_job = PeriodicJob(_GLOBAL_HB, self, lambda client: client.send_heartbeat(),
+                                   lambda client: client.heartbeat_interval)
+        self.udp_heartbeat_port = udp_heartbeat_port
+        self._hb_sock: Optional[socket.socket] = None
+        self._hb_dest: Optional[Tuple[str, int]] = None
+        self.heartbeat_format = heartbeat_format
+        if heartbeat_format == "msgpack" and msgpack is None:
+            self.logger.warning("msgpack not installed, falling back to JSON heartbeats")
+            self.heartbeat_format = "json"
+        
+        # Circuit breaker: fast-fail supervisor calls after repeated failures
+        self._breaker = CircuitBreaker()
         
         self.logger.info(f"Registry Client initialized for agent: {agent_id}")
     
+    @property
+    def _session(self) -> requests.Session:
+        """Pooled session for the current supervisor"""
+        return shared_session(self.supervisor_url or "")
+    
     # ==================== Agent Metadata ====================
     
     def get_metadata(self, include_status: bool = True) -> Dict[str, Any]:
@@ -117,6 +148,10 @@ class RegistryClient:
         Returns:
             True if registration successful, False otherwise
         """
+        if self._breaker.is_open():
+            self.logger.warning("Registration skipped: supervisor circuit breaker is open")
+            return False
+        
         try:
             self.logger.info(f"Attempting to register with supervisor at {supervisor_url}")
             
@@ -125,7 +160,7 @@ class RegistryClient:
             payload["registration_time"] = datetime.now().isoformat()
             
             # Make registration request
-            response = requests.post(
+            response = shared_session(supervisor_url).post(
                 f"{supervisor_url}/register",
                 json=payload,
                 timeout=timeout,
@@ -137,6 +172,17 @@ class RegistryClient:
                 self.supervisor_url = supervisor_url
                 self.is_registered = True
                 self.registration_time = datetime.now()
+                self._breaker.record_success()
+                
+                # Dedicated keep-alive socket for the fixed-shape heartbeat request
+                _, content_type = self._encode_heartbeat()
+                self._hb_conn = HeartbeatConnection(supervisor_url, content_type)
+                if self.udp_heartbeat_port:
+                    try:
+                        self._hb_sock, self._hb_dest = open_udp_socket(supervisor_url, self.udp_heartbeat_port)
+                        self.logger.info(f"UDP heartbeats enabled ({self._hb_dest[0]}:{self.udp_heartbeat_port})")
+                    except OSError as e:
+                        self.logger.warning(f"UDP heartbeat setup failed, using TCP: {str(e)}")
                 
                 self.logger.info(f"Successfully registered with supervisor: {self.agent_id}")
                 
@@ -146,16 +192,17 @@ class RegistryClient:
                 return True
             else:
                 self.logger.error(f"Registration failed: HTTP {response.status_code} - {response.text}")
+                self._breaker.record_failure()
                 return False
                 
-        except requests.exceptions.Timeout:
-            self.logger.error(f"Registration timeout after {timeout}s")
-            return False
-        except requests.exceptions.ConnectionError:
-            self.logger.error(f"Could not connect to supervisor at {supervisor_url}")
+        except requests.RequestException as e:
+            self.logger.error(f"Registration error with supervisor at {supervisor_url}: {str(e)}")
+            self._breaker.record_failure()
             return False
         except Exception as e:
-            self.logger.error(f"Registration error: {str(e)}")
+            # Reason: malformed URLs or responses must not escape a method documented to return False
+            self.logger.error(f"Unexpected registration error: {str(e)}")
+            self._breaker.record_failure()
             return False
     
     def unregister(self, timeout: int = 10) -> bool:
@@ -177,9 +224,17 @@ class RegistryClient:
             
             # Stop heartbeat first
             self.stop_heartbeat()
+            if self._hb_conn:
+                # Reason: shut down rather than drop the connection, so a tick already in flight
+                # fails on it instead of opening a new socket nothing would ever close
+                self._hb_conn.shutdown()
+            if self._hb_sock:
+                self._hb_sock.close()
+                self._hb_sock = None
+                self._hb_dest = None
             
             # Make unregistration request
-            response = requests.delete(
+            response = self._session.delete(
                 f"{self.supervisor_url}/unregister/{self.agent_id}",
                 timeout=timeout
             )
@@ -195,12 +250,24 @@ class RegistryClient:
                 self.logger.error(f"Unregistration failed: HTTP {response.status_code}")
                 return False
                 
-        except Exception as e:
+        except requests.RequestException as e:
             self.logger.error(f"Unregistration error: {str(e)}")
             return False
+        except Exception as e:
+            self.logger.error(f"Unexpected unregistration error: {str(e)}")
+            return False
     
     # ==================== Heartbeat Mechanism ====================
     
+    def _encode_heartbeat(self) -> Tuple[bytes, str]:
+        """
+        Encode the heartbeat payload in the configured wire format
+        
+        Returns:
+            Tuple of (request body, content type)
+        """
+        return encode_heartbeat(self.agent_id, self.heartbeat_format)
+    
     def send_heartbeat(self) -> bool:
         """
         Send a heartbeat to the supervisor to indicate this agent is alive
@@ -211,63 +278,52 @@ class RegistryClient:
         if not self.is_registered or not self.supervisor_url:
             return False
         
+        if self._breaker.is_open():
+            self.logger.debug("Heartbeat skipped: supervisor circuit breaker is open")
+            return False
+        
         try:
-            payload = {
-                "agent_id": self.agent_id,
-                "timestamp": datetime.now().isoformat(),
-                "status": "active"
-            }
+            body, content_type = self._encode_heartbeat()
             
-            response = requests.post(
-                f"{self.supervisor_url}/heartbeat",
-                json=payload,
-                timeout=5
-            )
+            if self._hb_sock is not None:
+                # Reason: a lost datagram is recovered by the next tick, so no reply is awaited
+                self._hb_sock.sendto(body, self._hb_dest)
+                self._breaker.record_success()
+                return True
             
-            if response.status_code == 200:
+            if self._hb_conn is None:
+                self._hb_conn = HeartbeatConnection(self.supervisor_url, content_type)
+            
+            status_code = self._hb_conn.send(body)
+            
+            if status_code == 200:
                 self.logger.debug(f"Heartbeat sent successfully")
+                self._breaker.record_success()
                 return True
             else:
-                self.logger.warning(f"Heartbeat failed: HTTP {response.status_code}")
+                self.logger.warning(f"Heartbeat failed: HTTP {status_code}")
+                self._breaker.record_failure()
                 return False
                 
         except Exception as e:
+            # Reason: besides OSError/HTTPException from the socket, malformed supervisor URLs raise
+            # ValueError; heartbeats run on the shared scheduler thread, so nothing may escape
             self.logger.error(f"Heartbeat error: {str(e)}")
+            self._breaker.record_failure()
             return False
     
-    def _heartbeat_loop(self):
-        """Internal method for heartbeat thread loop"""
-        self.logger.info(f"Heartbeat thread started (interval: {self.heartbeat_interval}s)")
-        
-        while not self.heartbeat_stop_event.is_set():
-            self.send_heartbeat()
-            
-            # Wait for interval or stop event
-            self.heartbeat_stop_event.wait(self.heartbeat_interval)
-        
-        self.logger.info("Heartbeat thread stopped")
-    
     def start_heartbeat(self):
         """Start sending periodic heartbeats to supervisor"""
-        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
+        if not self._hb_job.start():
             self.logger.warning("Heartbeat already running")
             return
         
-        self.heartbeat_stop_event.clear()
-        self.heartbeat_thread = Thread(target=self._heartbeat_loop, daemon=True)
-        self.heartbeat_thread.start()
-        
-        self.logger.info("Heartbeat mechanism started")
+        self.logger.info(f"Heartbeat mechanism started (interval: {self.heartbeat_interval}s)")
     
     def stop_heartbeat(self):
         """Stop sending heartbeats"""
-        if not self.heartbeat_thread or not self.heartbeat_thread.is_alive():
-            return
-        
-        self.heartbeat_stop_event.set()
-        self.heartbeat_thread.join(timeout=5)
-        
-        self.logger.info("Heartbeat mechanism stopped")
+        if self._hb_job.stop():
+            self.logger.info("Heartbeat mechanism stopped")
     
     # ==================== Inter-Agent Communication ====================
     
@@ -291,7 +347,7 @@ class RegistryClient:
             if agent_type:
                 url += f"?type={agent_type}"
             
-            response = requests.get(url, timeout=timeout)
+            response = self._session.get(url, timeout=timeout)
             
             if response.status_code == 200:
                 agents = response.json().get("agents", [])
@@ -301,9 +357,12 @@ class RegistryClient:
                 self.logger.error(f"Agent discovery failed: HTTP {response.status_code}")
                 return []
                 
-        except Exception as e:
+        except requests.RequestException as e:
             self.logger.error(f"Agent discovery error: {str(e)}")
             return []
+        except Exception as e:
+            self.logger.error(f"Unexpected agent discovery error: {str(e)}")
+            return []
     
     def call_agent(self, agent_id: str, endpoint: str, data: Dict[str, Any], 
                    method: str = "POST", timeout: int = 30) -> Optional[Dict[str, Any]]:
@@ -320,45 +379,41 @@ class RegistryClient:
         Returns:
             Response data or None if failed
         """
-        try:
-            # Get agent info from supervisor
-            agents = self.discover_agents()
-            target_agent = None
-            
-            for agent in agents:
-                if agent.get("agent_id") == agent_id:
-                    target_agent = agent
-                    break
+        # Get agent info from supervisor
+        target_agent = next((agent for agent in self.discover_agents() if agent.get("agent_id") == agent_id), None)
+        if not target_agent:
+            self.logger.error(f"Agent {agent_id} not found")
+            return None
+        
+        url = f"{target_agent.get('api_url', '')}{endpoint}"
+        self.logger.info(f"Calling agent {agent_id} at {url}")
+        return request_json(self._session, url, data, timeout, method)
+    
+    def call_agents(self, targets: List[Tuple[str, str, Dict[str, Any]]],
+                    timeout: int = 30) -> List[Optional[Dict[str, Any]]]:
+        """
+        Call several agents concurrently with POST requests
+        
+        Args:
+            targets: List of (agent_id, endpoint, data) tuples
+            timeout: Per-request timeout in seconds
             
-            if not target_agent:
+        Returns:
+            Response data (or None if failed) for each target, in input order
+        """
+        if not targets:
+            return []
+        
+        # One discovery call resolves every target
+        agent_urls = {agent.get("agent_id"): agent.get("api_url", "") for agent in self.discover_agents()}
+        calls = []
+        for agent_id, endpoint, data in targets:
+            if agent_id not in agent_urls:
                 self.logger.error(f"Agent {agent_id} not found")
-                return None
-            
-            # Construct URL
-            base_url = target_agent.get("api_url", "")
-            url = f"{base_url}{endpoint}"
-            
-            self.logger.info(f"Calling agent {agent_id} at {url}")
-            
-            # Make request
-            if method.upper() == "POST":
-                response = requests.post(url, json=data, timeout=timeout)
-            elif method.upper() == "GET":
-                response = requests.get(url, params=data, timeout=timeout)
-            else:
-                self.logger.error(f"Unsupported HTTP method: {method}")
-                return None
-            
-            if response.status_code == 200:
-                self.logger.info(f"Successfully called agent {agent_id}")
-                return response.json()
-            else:
-                self.logger.error(f"Agent call failed: HTTP {response.status_code}")
-                return None
-                
-        except Exception as e:
-            self.logger.error(f"Error calling agent {agent_id}: {str(e)}")
-            return None
+            calls.append((f"{agent_urls[agent_id]}{endpoint}", data) if agent_id in agent_urls else None)
+        
+        self.logger.info(f"Calling {sum(call is not None for call in calls)} agents concurrently")
+        return post_concurrently(self._session, calls, timeout)
     
     # ==================== Status & Monitoring ====================
     
@@ -379,7 +434,7 @@ class RegistryClient:
             "supervisor_url": self.supervisor_url,
             "registration_time": self.registration_time.isoformat() if self.registration_time else None,
             "uptime_seconds": uptime,
-            "heartbeat_active": self.heartbeat_thread is not None and self.heartbeat_thread.is_alive(),
+            "heartbeat_active": self._hb_job.active,
             "heartbeat_interval": self.heartbeat_interval,
             "api_url": self.api_url
         }
@@ -0,0 +1,450 @@
+"""
+Transport helpers for the Registry Client
+Pooled HTTP sessions, a circuit breaker, heartbeat encoding and sockets, a shared heartbeat
+scheduler with periodic jobs and concurrent agent calls used by every RegistryClient
+"""
+
+import http.client
+import json
+import sched
+import socket
+import ssl
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from src.logger import get_logger
+except ImportError:
+    from logger import get_logger
+
+# Optional compact binary encoding for heartbeats
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = get_logger(__name__)
+
+# Process-wide pooled sessions, one per supervisor
+_SESSIONS: Dict[str, requests.Session] = {}
+_SESSIONS_LOCK = Lock()
+
+# Connections kept per host, and workers for fan-out agent calls
+# Reason: matching sizes let every concurrent call reuse a pooled connection instead of discarding extras
+_POOL_SIZE = 10
+
+# Worker pool shared by every client for fan-out agent calls
+_CALL_POOL = ThreadPoolExecutor(max_workers=_POOL_SIZE, thread_name_prefix="agent-call")
+
+
+def build_session() -> requests.Session:
+    """
+    Build a pooled HTTP session that retries transient supervisor failures
+
+    Returns:
+        requests.Session with a retrying HTTPAdapter mounted for http and https
+    """
+    retry = Retry(
+        total=3,
+        connect=3,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=["POST", "GET", "DELETE"]
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=_POOL_SIZE)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def shared_session(supervisor_url: str) -> requests.Session:
+    """
+    Get the process-wide pooled session for a supervisor, creating it on first use
+
+    Args:
+        supervisor_url: Base URL of the supervisor registry
+
+    Returns:
+        requests.Session shared by every client talking to that supervisor
+    """
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(supervisor_url)
+        if session is None:
+            session = _SESSIONS[supervisor_url] = build_session()
+        return session
+
+
+class CircuitBreaker:
+    """Fast-fails supervisor calls after repeated consecutive failures"""
+
+    def __init__(self, threshold: int = 5):
+        """
+        Initialize a closed breaker
+
+        Args:
+            threshold: Consecutive failures that open the breaker
+        """
+        self.threshold = threshold
+        self.fails = 0
+        self.open_until = 0.0
+
+    def is_open(self) -> bool:
+        """Check whether the breaker is currently rejecting calls"""
+        return time.monotonic() < self.open_until
+
+    def record_failure(self):
+        """Record a failed call and open the breaker once the threshold is reached"""
+        self.fails += 1
+        if self.fails >= self.threshold:
+            # Reason: exponential cool-down capped at 5 minutes, then one half-open probe
+            cooldown = min(300, 2 ** self.fails)
+            self.open_until = time.monotonic() + cooldown
+            logger.warning(f"Supervisor circuit breaker open for {cooldown}s after {self.fails} failures")
+
+    def record_success(self):
+        """Close the breaker after a successful call"""
+        self.fails = 0
+        self.open_until = 0.0
+
+
+def encode_heartbeat(agent_id: str, heartbeat_format: str = "json") -> Tuple[bytes, str]:
+    """
+    Encode a heartbeat payload
+
+    Args:
+        agent_id: ID of the agent sending the heartbeat
+        heartbeat_format: "json" (default) or "msgpack"
+
+    Returns:
+        Tuple of (request body, content type)
+    """
+    if heartbeat_format == "msgpack" and msgpack is not None:
+        # Reason: short keys and an integer timestamp keep the payload ~40 bytes
+        body = msgpack.packb({"i": agent_id, "t": int(time.time()), "s": 1})
+        return body, "application/msgpack"
+
+    payload = {
+        "agent_id": agent_id,
+        "timestamp": datetime.now().isoformat(),
+        "status": "active"
+    }
+    return json.dumps(payload, separators=(",", ":")).encode(), "application/json"
+
+
+def open_udp_socket(supervisor_url: str, port: int) -> Tuple[socket.socket, Tuple[str, int]]:
+    """
+    Open a datagram socket for best-effort UDP heartbeats
+
+    Args:
+        supervisor_url: Base URL of the supervisor registry (its host receives the datagrams)
+        port: Supervisor UDP port
+
+    Returns:
+        Tuple of (socket, destination address)
+
+    Raises:
+        OSError: If the host cannot be resolved or the socket cannot be opened
+    """
+    host = socket.gethostbyname(urlsplit(supervisor_url).hostname or "localhost")
+    return socket.socket(socket.AF_INET, socket.SOCK_DGRAM), (host, port)
+
+
+class HeartbeatConnection:
+    """
+    Persistent keep-alive connection for the fixed-shape heartbeat request.
+    The request line and headers are pre-encoded once, so each tick is a single
+    write of template + body on a warm socket instead of a full requests round-trip.
+    """
+
+    def __init__(self, supervisor_url: str, content_type: str, timeout: float = 5):
+        """
+        Initialize the connection (the socket is opened on first send)
+
+        Args:
+            supervisor_url: Base URL of the supervisor registry
+            content_type: Content type of heartbeat bodies
+            timeout: Socket timeout in seconds
+        """
+        parts = urlsplit(supervisor_url)
+        self.use_tls = parts.scheme == "https"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.use_tls else 80)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = Lock()
+        self._stopped = False
+
+        path = parts.path.rstrip("/") + "/heartbeat"
+        self._head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Connection: keep-alive\r\n"
+            f"Content-Length: "
+        ).encode("ascii")
+
+    def _connect(self) -> socket.socket:
+        """Open the socket if it is not already connected"""
+        with self._lock:
+            # Reason: a tick in flight must not reopen a socket that shutdown has released
+            if self._stopped:
+                raise OSError("Heartbeat connection has been shut down")
+            if self._sock is None:
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                if self.use_tls:
+                    sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+                self._sock = sock
+            return self._sock
+
+    def _exchange(self, request: bytes) -> int:
+        """Write one request and read its response on the current socket"""
+        sock = self._connect()
+        sock.sendall(request)
+        response = http.client.HTTPResponse(sock, method="POST")
+        try:
+            response.begin()
+            response.read()
+        finally:
+            response.close()
+        if response.will_close:
+            self.close()
+        return response.status
+
+    def send(self, body: bytes) -> int:
+        """
+        Send a heartbeat body, reconnecting once if the kept-alive socket went stale
+
+        Args:
+            body: Encoded heartbeat payload
+
+        Returns:
+            HTTP status code returned by the supervisor
+
+        Raises:
+            OSError, http.client.HTTPException: If the supervisor cannot be reached
+        """
+        request = self._head + str(len(body)).encode("ascii") + b"\r\n\r\n" + body
+        reused = self._sock is not None
+        try:
+            return self._exchange(request)
+        except (OSError, http.client.HTTPException):
+            self.close()
+            if not reused:
+                raise
+            # Reason: the server may have closed an idle keep-alive socket between ticks
+            return self._exchange(request)
+
+    def close(self):
+        """Close the underlying socket (the next send reconnects)"""
+        with self._lock:
+            if self._sock is not None:
+                try:
+                    self._sock.close()
+                except OSError:
+                    pass
+                self._sock = None
+
+    def shutdown(self):
+        """Close the socket for good; later sends fail instead of reconnecting"""
+        with self._lock:
+            self._stopped = True
+        self.close()
+
+
+class SharedScheduler:
+    """
+    Heap-based scheduler driven by a single lazily started daemon thread.
+    Lets any number of clients schedule periodic work without a thread each.
+    """
+
+    def __init__(self, name: str = "registry-heartbeat"):
+        """
+        Initialize the scheduler (the worker thread starts on first use)
+
+        Args:
+            name: Name of the background thread
+        """
+        self.name = name
+        self._wakeup = Event()
+        self._scheduler = sched.scheduler(time.monotonic, self._delay)
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def _delay(self, timeout: float):
+        """Sleep until the next event is due, waking early when new events arrive"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def _run(self):
+        """Worker loop: drain due events, then idle until something is scheduled"""
+        while True:
+            self._scheduler.run()
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+    def _run_action(self, action: Callable[..., Any], argument: Tuple):
+        """Run one scheduled action, logging instead of propagating its errors"""
+        try:
+            action(*argument)
+        except Exception as e:
+            # Reason: sched.run() re-raises action errors, which would kill the thread every client shares
+            logger.error(f"Scheduled action {getattr(action, '__name__', action)!s} failed: {str(e)}")
+
+    def enter(self, delay: float, action: Callable[..., Any], argument: Tuple = ()) -> sched.Event:
+        """
+        Schedule an action to run after a delay
+
+        Args:
+            delay: Seconds from now
+            action: Callable to run on the scheduler thread
+            argument: Positional arguments for the action
+
+        Returns:
+            Scheduled event handle (pass to cancel)
+        """
+        event = self._scheduler.enter(delay, 1, self._run_action, (action, argument))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        # Reason: the worker may be sleeping until a later event; re-evaluate the queue
+        self._wakeup.set()
+        return event
+
+    def cancel(self, event: Optional[sched.Event]):
+        """
+        Cancel a scheduled event if it has not run yet
+
+        Args:
+            event: Event handle returned by enter
+        """
+        if event is None:
+            return
+        try:
+            self._scheduler.cancel(event)
+        except ValueError:
+            # Event already ran or was cancelled
+            pass
+
+
+class PeriodicJob:
+    """
+    Repeating job on a SharedScheduler.
+    Holds only a weak reference to its owner, so a scheduled tick never keeps a dropped owner alive.
+    """
+
+    def __init__(self, scheduler: SharedScheduler, owner: Any,
+                 tick: Callable[[Any], Any], interval: Callable[[Any], float]):
+        """
+        Initialize the job (nothing is scheduled until start)
+
+        Args:
+            scheduler: Scheduler whose thread runs the ticks
+            owner: Object passed to tick and interval
+            tick: Work to run each period, called with the owner
+            interval: Returns the owner's current period in seconds
+        """
+        self._scheduler = scheduler
+        self._owner = weakref.ref(owner)
+        self._tick = tick
+        self._interval = interval
+        self._event: Optional[sched.Event] = None
+        self._lock = Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether a tick is currently scheduled"""
+        return self._event is not None
+
+    def start(self) -> bool:
+        """Schedule an immediate first tick; returns False if already running"""
+        with self._lock:
+            if self._event is not None:
+                return False
+            self._event = self._scheduler.enter(0, self._run)
+        return True
+
+    def stop(self) -> bool:
+        """Cancel the pending tick; returns False if not running"""
+        with self._lock:
+            if self._event is None:
+                return False
+            self._scheduler.cancel(self._event)
+            self._event = None
+        return True
+
+    def _run(self):
+        """Run one tick, then queue the next unless the job was stopped or its owner dropped"""
+        owner = self._owner()
+        # Reason: the first tick can fire before start has stored its event, so check under the lock
+        with self._lock:
+            if owner is None or self._event is None:
+                return
+        try:
+            self._tick(owner)
+        finally:
+            with self._lock:
+                # Reason: stop may have run while the tick was in flight
+                if self._event is not None:
+                    self._event = self._scheduler.enter(self._interval(owner), self._run)
+
+
+def request_json(session: requests.Session, url: str, data: Dict[str, Any],
+                 timeout: float, method: str = "POST") -> Optional[Dict[str, Any]]:
+    """
+    Call an agent endpoint and decode its JSON reply
+
+    Args:
+        session: Pooled session to send through
+        url: Target URL
+        data: JSON body for POST, query parameters for GET
+        timeout: Request timeout in seconds
+        method: "POST" or "GET"
+
+    Returns:
+        Decoded response body, or None if the call failed
+    """
+    try:
+        if method.upper() == "POST":
+            response = session.post(url, json=data, timeout=timeout)
+        elif method.upper() == "GET":
+            response = session.get(url, params=data, timeout=timeout)
+        else:
+            logger.error(f"Unsupported HTTP method: {method}")
+            return None
+        if response.status_code == 200:
+            return response.json()
+        logger.error(f"Agent call to {url} failed: HTTP {response.status_code}")
+    except requests.RequestException as e:
+        logger.error(f"Error calling agent at {url}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error calling agent at {url}: {str(e)}")
+    return None
+
+
+def post_concurrently(session: requests.Session, calls: List[Optional[Tuple[str, Dict[str, Any]]]],
+                      timeout: float) -> List[Optional[Dict[str, Any]]]:
+    """
+    POST several JSON bodies concurrently on the shared call pool
+
+    Args:
+        session: Pooled session to send through
+        calls: (url, data) per call; None entries are skipped and yield None
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        Decoded response body (or None if failed) for each call, in input order
+    """
+    futures = [None if call is None else _CALL_POOL.submit(request_json, session, *call, timeout)
+               for call in calls]
+    return [None if future is None else future.result() for future in futures]
@@ -0,0 +1,20 @@
+"""
+Request schemas for Loyalty AI Agent
+Shared field types for declarative request validation
+"""
+
+from typing import Annotated
+
+from pydantic import StringConstraints
+
+try:
+    from src.validators import MAX_CUSTOMER_ID_LENGTH
+except ImportError:
+    from validators import MAX_CUSTOMER_ID_LENGTH
+
+
+# Same rules as validate_customer_id, enforced inside pydantic's compiled core
+CustomerId = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_CUSTOMER_ID_LENGTH)
+]
@@ -5,6 +5,9 @@ Input validation utilities for Loyalty AI Agent
 from typing import Any, Optional, List
 from datetime import datetime
 
+# Maximum accepted length of a customer identifier
+MAX_CUSTOMER_ID_LENGTH = 50
+
 
 class ValidationError(Exception):
     """Custom exception for validation errors"""
@@ -29,6 +32,11 @@ def validate_customer_id(customer_id: Any) -> str:
     Raises:
         ValidationError: If customer_id is invalid
     """
+    # Reason: most callers pass an already-trimmed str, so skip the str()/strip() copies
+    if (type(customer_id) is str and 0 < len(customer_id) <= MAX_CUSTOMER_ID_LENGTH
+            and customer_id == customer_id.strip()):
+        return customer_id
+
     if customer_id is None:
         raise ValidationError("Customer ID cannot be None")
 
@@ -37,8 +45,8 @@ def validate_customer_id(customer_id: Any) -> str:
     if not customer_id:
         raise ValidationError("Customer ID cannot be empty")
 
-    if len(customer_id) > 50:
-        raise ValidationError("Customer ID too long (max 50 characters)")
+    if len(customer_id) > MAX_CUSTOMER_ID_LENGTH:
+        raise ValidationError(f"Customer ID too long (max {MAX_CUSTOMER_ID_LENGTH} characters)")
 
     return customer_id
 
@@ -57,11 +65,27 @@ def validate_positive_number(value: Any, field_name: str = "value") -> float:
     Raises:
         ValidationError: If value is not a positive number
     """
+    # Reason: almost every caller passes a float or int, so skip the float()/try setup for them
+    value_type = type(value)
+    if value_type is float:
+        if value != value:
+            raise ValidationError(f"{field_name} must be a number")
+        if value < 0:
+            raise ValidationError(f"{field_name} must be non-negative")
+        return value
+    if value_type is int:
+        if value < 0:
+            raise ValidationError(f"{field_name} must be non-negative")
+        return float(value)
+
     try:
         num = float(value)
     except (TypeError, ValueError):
         raise ValidationError(f"{field_name} must be a number")
 
+    if num != num:
+        raise ValidationError(f"{field_name} must be a number")
+
     if num < 0:
         raise ValidationError(f"{field_name} must be non-negative")
 
@@ -82,6 +106,9 @@ def validate_probability(value: Any, field_name: str = "probability") -> float:
     Raises:
         ValidationError: If value is not a valid probability
     """
+    if type(value) is float and 0.0 <= value <= 1.0:
+        return value
+
     num = validate_positive_number(value, field_name)
 
     if num > 1.0:
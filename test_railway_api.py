@@ -5,9 +5,12 @@ Tests all endpoints deployed on Railway
 Run with: python test_railway_api.py
 """
 
-import json
+import asyncio
 from datetime import datetime
 
+import httpx
+import orjson
+
 # API Base URL - Update this with your Railway deployment URL
 BASE_URL = "https://web-production-37e1.up.railway.app"
 
@@ -18,101 +21,82 @@ def print_section(title):
     print("="*70)
 
 def print_response(response):
-    """Print formatted API response"""
+    """Print formatted API response (or the error raised while fetching it)"""
+    if isinstance(response, Exception):
+        print(f"❌ Error: {response}")
+        return
     print(f"\nStatus Code: {response.status_code}")
     if response.status_code == 200:
         print("✅ Success!")
         print("\nResponse:")
-        print(json.dumps(response.json(), indent=2))
+        print(orjson.dumps(response.json(), option=orjson.OPT_INDENT_2).decode())
     else:
         print("❌ Failed!")
         print(f"Error: {response.text}")
 
-def test_root():
-    """Test root endpoint"""
+async def check_status_endpoints(client):
+    """Test root, health and metrics endpoints concurrently"""
+    # Reason: the three GETs are independent, so they share one round-trip of latency
+    root, health, metrics = await asyncio.gather(
+        client.get("/"),
+        client.get("/health"),
+        client.get("/metrics"),
+        return_exceptions=True
+    )
+
     print_section("1. Testing Root Endpoint (GET /)")
-    try:
-        import requests
-        response = requests.get(f"{BASE_URL}/", verify=False)
-        print_response(response)
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    print_response(root)
 
-def test_health():
-    """Test health check endpoint"""
     print_section("2. Testing Health Check (GET /health)")
-    try:
-        import requests
-        response = requests.get(f"{BASE_URL}/health", verify=False)
-        print_response(response)
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    print_response(health)
 
-def test_metrics():
-    """Test metrics endpoint"""
     print_section("3. Testing Metrics (GET /metrics)")
-    try:
-        import requests
-        response = requests.get(f"{BASE_URL}/metrics", verify=False)
-        print_response(response)
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    print_response(metrics)
 
-def test_analyze_customer():
+async def check_analyze_customer(client):
     """Test analyze customer endpoint"""
     print_section("4. Testing Analyze Customer (POST /analyze)")
     try:
-        import requests
-        
         # Test basic analysis
         payload = {
             "customer_id": "CUST000001",
             "include_history": False
         }
-        response = requests.post(
-            f"{BASE_URL}/analyze",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            verify=False
-        )
+        response = await client.post("/analyze", json=payload)
         print_response(response)
-        
+
         # Test with different customer
         print("\n--- Testing with CUST000050 ---")
         payload = {
             "customer_id": "CUST000050",
             "include_history": False
         }
-        response = requests.post(
-            f"{BASE_URL}/analyze",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            verify=False
-        )
+        response = await client.post("/analyze", json=payload)
         print_response(response)
-        
-    except Exception as e:
+
+    except httpx.HTTPError as e:
         print(f"❌ Error: {e}")
 
-def test_invalid_customer():
+async def check_invalid_customer(client):
     """Test error handling with invalid customer"""
     print_section("5. Testing Error Handling (Invalid Customer)")
     try:
-        import requests
         payload = {
             "customer_id": "CUST999999",  # Valid format but doesn't exist
             "include_history": False
         }
-        response = requests.post(
-            f"{BASE_URL}/analyze",
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            verify=False
-        )
+        response = await client.post("/analyze", json=payload)
         print_response(response)
-    except Exception as e:
+    except httpx.HTTPError as e:
         print(f"❌ Error: {e}")
 
+async def run_checks():
+    """Run every endpoint check over one multiplexed HTTP/2 connection"""
+    async with httpx.AsyncClient(http2=True, base_url=BASE_URL, verify=False, timeout=30) as client:
+        await check_status_endpoints(client)
+        await check_analyze_customer(client)
+        await check_invalid_customer(client)
+
 def run_all_tests():
     """Run all API tests"""
     print("\n" + "🚀"*35)
@@ -120,34 +104,13 @@ def run_all_tests():
     print(f"  Base URL: {BASE_URL}")
     print(f"  Test Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("🚀"*35)
-    
+
     # Run all tests
-    test_root()
-    test_health()
-    test_metrics()
-    test_analyze_customer()
-    test_invalid_customer()
-    
+    asyncio.run(run_checks())
+
     print("\n" + "="*70)
     print("  ✅ ALL TESTS COMPLETED!")
     print("="*70 + "\n")
 
 if __name__ == "__main__":
-    print("\nChecking for required packages...")
-    try:
-        import requests
-        print("✅ requests library found")
-    except ImportError:
-        import subprocess
-        import sys
-        print("Installing requests library...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "requests"])
-        import requests
-        print("✅ requests library installed")
-    
-    # Disable SSL warnings for testing
-    import urllib3
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    
-    # Run the test suite
     run_all_tests()
@@ -5,17 +5,56 @@ Unit tests for Phase 1: Data Generator and Loyalty Agent
 import sys
 import os
 import json
+from datetime import date, timedelta
+from functools import lru_cache
 from pathlib import Path
 
+import numpy as np
+import pytest
+from pydantic import TypeAdapter, ValidationError as PydanticValidationError
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.data_generator import CustomerDataGenerator
 from src.loyalty_agent import LoyaltyAgent
-from src.validators import validate_customer_id, validate_probability, ValidationError
+from src.validators import validate_customer_id, validate_probability, ValidationError, CustomerNotFoundError
+from src.schemas import CustomerId
 from src.constants import REWARD_CATALOG, RFM_CHAMPION_THRESHOLD
 
 
+REQUIRED_CUSTOMER_FIELDS = frozenset({
+    'customer_id', 'segment', 'loyalty_tier', 'registration_date', 'lifetime_value', 'engagement_score'
+})
+REQUIRED_TXN_FIELDS = frozenset({
+    'transaction_id', 'customer_id', 'timestamp', 'product_category', 'final_amount', 'status'
+})
+
+# Test report lines, written to stdout in one call per module
+LOG = []
+
+
+def flush_log():
+    """Write and clear the buffered report lines"""
+    if LOG:
+        sys.stdout.write("\n".join(LOG) + "\n")
+        LOG.clear()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _flush_log_after_module():
+    """Emit the buffered report once the module's tests finish"""
+    yield
+    flush_log()
+
+
+@lru_cache(maxsize=4)
+def _gen(num_customers, num_transactions, seed):
+    """Generate a seeded corpus once per (size, seed); tests must not mutate the result"""
+    generator = CustomerDataGenerator(num_customers=num_customers, num_transactions=num_transactions, seed=seed)
+    return generator.generate_all_data()
+
+
 class TestDataGenerator:
     """Test suite for CustomerDataGenerator"""
 
@@ -24,115 +63,139 @@ class TestDataGenerator:
         generator = CustomerDataGenerator(num_customers=10, num_transactions=50, seed=42)
         assert generator.num_customers == 10
         assert generator.num_transactions == 50
-        print("✓ Generator initialization test passed")
+        LOG.append("✓ Generator initialization test passed")
 
     def test_customer_generation(self):
         """Test customer profile generation"""
-        generator = CustomerDataGenerator(num_customers=5, num_transactions=10, seed=42)
-        customers, transactions = generator.generate_all_data()
+        customers, transactions = _gen(5, 10, 42)
 
         assert len(customers) == 5, f"Expected 5 customers, got {len(customers)}"
         assert len(transactions) == 10, f"Expected 10 transactions, got {len(transactions)}"
 
         # Check customer structure
-        customer = customers[0]
-        required_fields = ['customer_id', 'segment', 'loyalty_tier', 'registration_date',
-                          'lifetime_value', 'engagement_score']
-        for field in required_fields:
-            assert field in customer, f"Missing field: {field}"
+        missing = REQUIRED_CUSTOMER_FIELDS - customers[0].keys()
+        assert not missing, f"Missing fields: {sorted(missing)}"
 
-        print("✓ Customer generation test passed")
+        LOG.append("✓ Customer generation test passed")
 
     def test_transaction_generation(self):
         """Test transaction generation"""
-        generator = CustomerDataGenerator(num_customers=5, num_transactions=10, seed=42)
-        customers, transactions = generator.generate_all_data()
+        customers, transactions = _gen(5, 10, 42)
 
         # Check transaction structure
-        transaction = transactions[0]
-        required_fields = ['transaction_id', 'customer_id', 'timestamp',
-                          'product_category', 'final_amount', 'status']
-        for field in required_fields:
-            assert field in transaction, f"Missing field: {field}"
+        missing = REQUIRED_TXN_FIELDS - transactions[0].keys()
+        assert not missing, f"Missing fields: {sorted(missing)}"
 
         # Verify customer_id references exist
-        customer_ids = {c['customer_id'] for c in customers}
-        for txn in transactions:
-            assert txn['customer_id'] in customer_ids, \
-                f"Transaction references non-existent customer: {txn['customer_id']}"
+        txn_ids = np.fromiter((t['customer_id'] for t in transactions), dtype=object, count=len(transactions))
+        customer_ids = np.fromiter((c['customer_id'] for c in customers), dtype=object, count=len(customers))
+        known = np.isin(txn_ids, customer_ids)
+        assert known.all(), f"Transaction references non-existent customer: {txn_ids[~known].tolist()}"
 
-        print("✓ Transaction generation test passed")
+        LOG.append("✓ Transaction generation test passed")
 
 
 class TestValidators:
     """Test suite for validation utilities"""
 
-    def test_validate_customer_id(self):
-        """Test customer ID validation"""
-        # Valid cases
-        assert validate_customer_id("CUST123") == "CUST123"
-        assert validate_customer_id("  CUST456  ") == "CUST456"
-
-        # Invalid cases
-        try:
-            validate_customer_id(None)
-            assert False, "Should raise ValidationError for None"
-        except ValidationError:
-            pass
-
-        try:
-            validate_customer_id("")
-            assert False, "Should raise ValidationError for empty string"
-        except ValidationError:
-            pass
-
-        print("✓ Customer ID validation test passed")
-
-    def test_validate_probability(self):
-        """Test probability validation"""
-        # Valid cases
-        assert validate_probability(0.5) == 0.5
-        assert validate_probability(0) == 0.0
-        assert validate_probability(1.0) == 1.0
-
-        # Invalid cases
-        try:
-            validate_probability(-0.1)
-            assert False, "Should raise ValidationError for negative value"
-        except ValidationError:
-            pass
-
-        try:
-            validate_probability(1.5)
-            assert False, "Should raise ValidationError for value > 1"
-        except ValidationError:
-            pass
-
-        print("✓ Probability validation test passed")
+    @pytest.mark.parametrize("value, expected", [
+        ("CUST123", "CUST123"),
+        ("  CUST456  ", "CUST456"),
+    ])
+    def test_validate_customer_id(self, value, expected):
+        """Test customer ID validation of valid IDs"""
+        assert validate_customer_id(value) == expected
+
+        LOG.append(f"✓ Customer ID validation test passed: {value!r}")
+
+    @pytest.mark.parametrize("value", [None, "", "C" * 51])
+    def test_validate_customer_id_rejects(self, value):
+        """Test customer ID validation of invalid IDs"""
+        with pytest.raises(ValidationError):
+            validate_customer_id(value)
+
+        LOG.append(f"✓ Customer ID rejection test passed: {value!r:.20}")
+
+    @pytest.mark.parametrize("value, expected", [
+        (0.5, 0.5),
+        (0, 0.0),
+        (1.0, 1.0),
+        (1, 1.0),
+        ("0.25", 0.25),
+    ])
+    def test_validate_probability(self, value, expected):
+        """Test probability validation of valid values"""
+        assert validate_probability(value) == expected
+
+        LOG.append(f"✓ Probability validation test passed: {value!r}")
+
+    @pytest.mark.parametrize("value", [-0.1, 1.5, float("nan")])
+    def test_validate_probability_rejects(self, value):
+        """Test probability validation of invalid values"""
+        with pytest.raises(ValidationError):
+            validate_probability(value)
+
+        LOG.append(f"✓ Probability rejection test passed: {value!r}")
+
+
+class TestSchemas:
+    """Test suite for request schemas"""
+
+    def test_customer_id_is_stripped(self):
+        """Test that CustomerId strips surrounding whitespace"""
+        assert TypeAdapter(CustomerId).validate_python("  CUST123  ") == "CUST123"
+        LOG.append("✓ CustomerId cleaning test passed")
+
+    @pytest.mark.parametrize("value", ["", "   ", "C" * 51])
+    def test_customer_id_rejects_invalid(self, value):
+        """Test that CustomerId enforces the validate_customer_id length rules"""
+        with pytest.raises(PydanticValidationError):
+            TypeAdapter(CustomerId).validate_python(value)
+        LOG.append(f"✓ CustomerId rejection test passed: {value!r}")
+
+
+def setup_test_data():
+    """In-memory test data for agent tests (seeded, so generated once per process)"""
+    return _gen(100, 500, 42)
+
+
+def make_agent(**kwargs):
+    """Build an agent directly from the in-memory test data"""
+    customers, transactions = setup_test_data()
+    return LoyaltyAgent(customers=customers, transactions=transactions, **kwargs)
+
+
+def write_test_data(output_dir):
+    """Write the test data to JSON files and return an agent loading them"""
+    customers, transactions = setup_test_data()
+    CustomerDataGenerator(num_customers=100, num_transactions=500, seed=42).save_to_json(
+        customers, transactions, output_dir=str(output_dir)
+    )
+    return LoyaltyAgent(customers_file=str(Path(output_dir) / "customers.json"),
+                        transactions_file=str(Path(output_dir) / "transactions.json"),
+                        cache_rate=1.0)
+
+
+@pytest.fixture(scope="module")
+def agent_and_id():
+    """Generate agent test data once and share one agent across the module"""
+    agent = make_agent()
+    return agent, agent.customers[0]['customer_id']
 
 
 class TestLoyaltyAgent:
     """Test suite for LoyaltyAgent"""
 
-    @classmethod
-    def setup_test_data(cls):
-        """Generate test data for agent tests"""
-        generator = CustomerDataGenerator(num_customers=100, num_transactions=500, seed=42)
-        customers, transactions = generator.generate_all_data()
-        generator.save_to_json(customers, transactions, output_dir="data")
-        return customers[0]['customer_id']
-
-    def test_agent_initialization(self):
+    def test_agent_initialization(self, agent_and_id):
         """Test that agent initializes and loads data"""
-        agent = LoyaltyAgent()
+        agent, _ = agent_and_id
         assert len(agent.customers) > 0, "No customers loaded"
         assert len(agent.transactions) > 0, "No transactions loaded"
-        print(f"✓ Agent initialization test passed (loaded {len(agent.customers)} customers)")
+        LOG.append(f"✓ Agent initialization test passed (loaded {len(agent.customers)} customers)")
 
-    def test_rfm_calculation(self):
+    def test_rfm_calculation(self, agent_and_id):
         """Test RFM score calculation"""
-        customer_id = self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, customer_id = agent_and_id
 
         rfm = agent.calculate_rfm_score(customer_id)
 
@@ -142,22 +205,127 @@ class TestLoyaltyAgent:
         assert 'frequency' in rfm, "Missing frequency score"
         assert 'monetary' in rfm, "Missing monetary score"
 
-        print(f"✓ RFM calculation test passed (score: {rfm['rfm_score']})")
+        LOG.append(f"✓ RFM calculation test passed (score: {rfm['rfm_score']})")
 
-    def test_churn_prediction(self):
+    def test_bulk_rfm_matches_single(self, agent_and_id):
+        """Test that vectorized bulk RFM scoring matches per-customer scoring"""
+        agent, _ = agent_and_id
+        customer_ids = [c['customer_id'] for c in agent.customers]
+
+        bulk = agent.calculate_rfm_scores_bulk(customer_ids)
+
+        assert len(bulk) == len(customer_ids)
+        for customer_id, row in zip(customer_ids, bulk):
+            rfm = agent.calculate_rfm_score(customer_id)
+            for field in ('recency', 'frequency', 'monetary', 'rfm_score'):
+                assert abs(float(row[field]) - rfm[field]) < 1e-3, \
+                    f"{field} mismatch for {customer_id}: {row[field]} != {rfm[field]}"
+
+        with pytest.raises(CustomerNotFoundError, match="INVALID999"):
+            agent.calculate_rfm_scores_bulk([customer_ids[0], "INVALID999"])
+
+        LOG.append(f"✓ Bulk RFM test passed ({len(bulk)} customers)")
+
+    def test_results_are_memoized(self):
+        """Test that per-customer results are cached and reset with the indexes"""
+        agent = make_agent()
+        customer_id = agent.customers[0]['customer_id']
+
+        reward = agent.recommend_reward(customer_id)
+        assert agent.recommend_reward(customer_id) is reward
+        assert agent.segment_customer(customer_id) is agent.segment_customer(customer_id)
+        assert customer_id in agent._cache.memos["rfm"]
+        assert customer_id in agent._cache.memos["churn"]
+
+        # Lookups of unknown customers are never cached
+        with pytest.raises(CustomerNotFoundError):
+            agent.calculate_rfm_score("INVALID999")
+        assert "INVALID999" not in agent._cache.memos["rfm"]
+
+        agent._build_indexes()
+        assert agent.recommend_reward(customer_id) is not reward
+        assert agent.recommend_reward(customer_id) == reward
+
+        LOG.append("✓ Memoization test passed")
+
+    def test_memos_expire_with_the_day(self):
+        """Test that date-dependent memos are dropped once the day changes"""
+        agent = make_agent()
+        customer_id = agent.customers[0]['customer_id']
+
+        reward = agent.recommend_reward(customer_id)
+        agent._cache.day -= timedelta(days=1)
+
+        assert agent.recommend_reward(customer_id) is not reward
+        assert agent._cache.day == date.today()
+        assert set(agent._cache.memos["rfm"]) == {customer_id}
+
+        churn = agent.compute_all_churn()
+        assert agent.compute_all_churn() is churn
+        agent._cache.day -= timedelta(days=1)
+        assert agent.compute_all_churn() is not churn
+
+        LOG.append("✓ Daily memo expiry test passed")
+
+    def test_analysis_cache_rate(self):
+        """Test that only a cache_rate fraction of analyses is cached"""
+        agent = make_agent(cache_rate=0.5)
+        customer_ids = [c['customer_id'] for c in agent.customers[:4]]
+
+        for customer_id in customer_ids:
+            agent.analyze_customer(customer_id)
+        assert len(agent._cache.analyses) == 2, f"Expected 2 cached analyses, got {len(agent._cache.analyses)}"
+
+        cached_id = next(iter(agent._cache.analyses))
+        first = agent._cache.analyses[cached_id]
+        again = agent.analyze_customer(cached_id)
+        assert again is not first
+        assert {k: v for k, v in again.items() if k != 'timestamp'} == \
+            {k: v for k, v in first.items() if k != 'timestamp'}
+
+        uncached = make_agent(cache_rate=0)
+        uncached.analyze_customer(customer_ids[0])
+        assert uncached._cache.analyses == {}
+
+        # Cached analyses are recomputed on a later day rather than re-stamped
+        agent._cache.day -= timedelta(days=1)
+        fresh = agent.analyze_customer(cached_id)
+        assert fresh['recommendation'] is not first['recommendation']
+        assert cached_id not in agent._cache.analyses or agent._cache.analyses[cached_id] is fresh
+
+        LOG.append("✓ Analysis cache rate test passed")
+
+    def test_reload_data_clears_caches(self, tmp_path):
+        """Test that reload_data drops memoized and cached analyses"""
+        agent = write_test_data(tmp_path)
+        customer_id = agent.customers[0]['customer_id']
+
+        first = agent.analyze_customer(customer_id)
+        assert customer_id in agent._cache.analyses
+
+        agent.reload_data()
+        assert agent._cache.analyses == {}
+        assert agent._cache.memos == {}
+        assert len(agent.customers) == 100
+
+        again = agent.analyze_customer(customer_id)
+        assert again['recommendation'] is not first['recommendation']
+        assert again['recommendation'] == first['recommendation']
+
+        LOG.append("✓ Reload data test passed")
+
+    def test_churn_prediction(self, agent_and_id):
         """Test churn probability prediction"""
-        customer_id = self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, customer_id = agent_and_id
 
         churn_prob = agent.predict_churn_probability(customer_id)
 
         assert 0 <= churn_prob <= 1, f"Churn probability out of range: {churn_prob}"
-        print(f"✓ Churn prediction test passed (probability: {churn_prob})")
+        LOG.append(f"✓ Churn prediction test passed (probability: {churn_prob})")
 
-    def test_customer_segmentation(self):
+    def test_customer_segmentation(self, agent_and_id):
         """Test customer segmentation"""
-        customer_id = self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, customer_id = agent_and_id
 
         segmentation = agent.segment_customer(customer_id)
 
@@ -166,12 +334,11 @@ class TestLoyaltyAgent:
         assert 'churn_probability' in segmentation, "Missing churn_probability"
         assert 'is_at_risk' in segmentation, "Missing is_at_risk flag"
 
-        print(f"✓ Customer segmentation test passed (segment: {segmentation['detailed_segment']})")
+        LOG.append(f"✓ Customer segmentation test passed (segment: {segmentation['detailed_segment']})")
 
-    def test_reward_recommendation(self):
+    def test_reward_recommendation(self, agent_and_id):
         """Test reward recommendation"""
-        customer_id = self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, customer_id = agent_and_id
 
         recommendation = agent.recommend_reward(customer_id)
 
@@ -182,12 +349,11 @@ class TestLoyaltyAgent:
         assert 'strategy' in recommendation, "Missing strategy"
         assert 'expected_roi' in recommendation, "Missing expected_roi"
 
-        print(f"✓ Reward recommendation test passed (reward: {recommendation['recommended_reward']})")
+        LOG.append(f"✓ Reward recommendation test passed (reward: {recommendation['recommended_reward']})")
 
-    def test_full_customer_analysis(self):
+    def test_full_customer_analysis(self, agent_and_id):
         """Test complete customer analysis"""
-        customer_id = self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, customer_id = agent_and_id
 
         analysis = agent.analyze_customer(customer_id)
 
@@ -199,12 +365,11 @@ class TestLoyaltyAgent:
         assert 'recommendation' in analysis, "Missing recommendation"
         assert 'kpis' in analysis, "Missing kpis"
 
-        print("✓ Full customer analysis test passed")
+        LOG.append("✓ Full customer analysis test passed")
 
-    def test_batch_analysis(self):
+    def test_batch_analysis(self, agent_and_id):
         """Test batch customer analysis"""
-        self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, _ = agent_and_id
 
         results = agent.batch_analyze(limit=5)
 
@@ -212,12 +377,11 @@ class TestLoyaltyAgent:
         for result in results:
             assert 'customer_id' in result, "Missing customer_id in batch result"
 
-        print(f"✓ Batch analysis test passed (analyzed {len(results)} customers)")
+        LOG.append(f"✓ Batch analysis test passed (analyzed {len(results)} customers)")
 
-    def test_high_value_at_risk(self):
+    def test_high_value_at_risk(self, agent_and_id):
         """Test high-value at-risk customer identification"""
-        self.setup_test_data()
-        agent = LoyaltyAgent()
+        agent, _ = agent_and_id
 
         at_risk = agent.get_high_value_at_risk_customers(threshold=0.5, min_ltv=10000)
 
@@ -232,66 +396,44 @@ class TestLoyaltyAgent:
             assert customer['churn_prediction']['probability'] >= 0.5, \
                 "Customer churn probability below threshold"
 
-        print(f"✓ High-value at-risk test passed (found {len(at_risk)} customers)")
+        LOG.append(f"✓ High-value at-risk test passed (found {len(at_risk)} customers)")
+
+    def test_high_value_at_risk_matches_scalar_scan(self, agent_and_id):
+        """Test that the vectorized pre-filter selects exactly the scalar matches"""
+        agent, _ = agent_and_id
+
+        churn = agent.compute_all_churn()
+        assert len(churn) == len(agent.customers)
+        for customer, vectorized in zip(agent.customers, churn):
+            assert abs(agent.predict_churn_probability(customer['customer_id']) - vectorized) <= 1e-3 + 1e-9
+
+        for threshold, min_ltv in [(0.5, 10000), (0.3, 5000)]:
+            expected = {
+                c['customer_id'] for c in agent.customers
+                if c['lifetime_value'] >= min_ltv
+                and agent.predict_churn_probability(c['customer_id']) >= threshold
+            }
+            at_risk = agent.get_high_value_at_risk_customers(threshold=threshold, min_ltv=min_ltv)
+            assert {a['customer_id'] for a in at_risk} == expected
+
+        LOG.append("✓ Vectorized at-risk filter test passed")
 
     def test_invalid_customer_handling(self):
         """Test handling of invalid customer IDs"""
-        from src.validators import CustomerNotFoundError
-        agent = LoyaltyAgent()
+        # Reason: the error path needs no records, so skip generating and indexing test data
+        agent = LoyaltyAgent(customers=[], transactions=[])
 
         # Test with non-existent customer - should raise exception
-        try:
+        with pytest.raises(CustomerNotFoundError, match="INVALID999"):
             agent.analyze_customer("INVALID999")
-            assert False, "Should raise CustomerNotFoundError for invalid customer"
-        except CustomerNotFoundError as e:
-            assert "INVALID999" in str(e), "Exception should contain customer ID"
 
-        print("✓ Invalid customer handling test passed")
+        LOG.append("✓ Invalid customer handling test passed")
 
 
 def run_all_tests():
-    """Run all test suites"""
-    print("=" * 70)
-    print("PHASE 1 TEST SUITE - Data Generator & Loyalty Agent")
-    print("=" * 70)
-
-    test_suites = [
-        ("Data Generator Tests", TestDataGenerator()),
-        ("Validator Tests", TestValidators()),
-        ("Loyalty Agent Tests", TestLoyaltyAgent())
-    ]
-
-    total_tests = 0
-    passed_tests = 0
-
-    for suite_name, test_suite in test_suites:
-        print(f"\n{suite_name}")
-        print("-" * 70)
-
-        test_methods = [method for method in dir(test_suite) if method.startswith('test_')]
-
-        for test_method in test_methods:
-            total_tests += 1
-            try:
-                getattr(test_suite, test_method)()
-                passed_tests += 1
-            except AssertionError as e:
-                print(f"✗ {test_method} FAILED: {e}")
-            except Exception as e:
-                print(f"✗ {test_method} ERROR: {e}")
-
-    print("\n" + "=" * 70)
-    print(f"TEST RESULTS: {passed_tests}/{total_tests} tests passed")
-    print("=" * 70)
-
-    if passed_tests == total_tests:
-        print("✓ ALL TESTS PASSED!")
-        return 0
-    else:
-        print(f"✗ {total_tests - passed_tests} test(s) failed")
-        return 1
+    """Run this module through pytest; kept for callers of the old hand-rolled runner"""
+    return int(pytest.main([__file__, "-q", "--no-header", "-p", "no:cacheprovider"]))
 
 
 if __name__ == "__main__":
-    exit_code = run_all_tests()
-    sys.exit(exit_code)
+    sys.exit(run_all_tests())
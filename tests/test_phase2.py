@@ -1,32 +1,72 @@
+import asyncio
+import atexit
 import httpx
-import json
+import orjson
+import os
 import time
 
-BASE_URL = "http://127.0.0.1:8000"
+# Server under test; set TEST_BASE_URL to run the checks against a deployment
+BASE_URL = os.environ.get("TEST_BASE_URL", "http://127.0.0.1:8000")
 
-def test_health():
+# Full response bodies are only printed when TEST_DEBUG=1
+DEBUG = os.environ.get("TEST_DEBUG") == "1"
+
+# One keep-alive client shared by every test, driven by one event loop.
+# Reason: HTTP/2 is negotiated via ALPN, so against a TLS deployment the gathered
+# checks multiplex over a single connection; plain http:// falls back to HTTP/1.1,
+# where one request per connection means the gathered checks need a pool
+CLIENT = httpx.AsyncClient(
+    base_url=BASE_URL, timeout=5.0, http2=True,
+    limits=(httpx.Limits(max_connections=1, max_keepalive_connections=1)
+            if BASE_URL.startswith("https") else httpx.Limits())
+)
+LOOP = asyncio.new_event_loop()
+
+def _close_client():
+    LOOP.run_until_complete(CLIENT.aclose())
+    LOOP.close()
+
+atexit.register(_close_client)
+
+def wait_ready(timeout=5):
+    """Poll /health with exponential backoff until the server answers"""
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{BASE_URL}/health", timeout=0.2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+    raise RuntimeError(f"server at {BASE_URL} not ready after {timeout}s")
+
+async def check_health(client):
     print("\n" + "="*50)
     print("Testing Health Endpoint...")
     print("="*50)
     
-    response = httpx.get(f"{BASE_URL}/health")
+    response = await client.get("/health")
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if DEBUG:
+        print(f"Response: {orjson.dumps(response.json(), option=orjson.OPT_INDENT_2).decode()}")
     assert response.status_code == 200
     print("✅ Health check passed!")
 
-def test_metrics():
+async def check_metrics(client):
     print("\n" + "="*50)
     print("Testing Metrics Endpoint...")
     print("="*50)
     
-    response = httpx.get(f"{BASE_URL}/metrics")
+    response = await client.get("/metrics")
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if DEBUG:
+        print(f"Response: {orjson.dumps(response.json(), option=orjson.OPT_INDENT_2).decode()}")
     assert response.status_code == 200
     print("✅ Metrics endpoint passed!")
 
-def test_analyze():
+async def check_analyze(client):
     print("\n" + "="*50)
     print("Testing Analyze Endpoint...")
     print("="*50)
@@ -36,18 +76,19 @@ def test_analyze():
         "customer_id": "CUST000001"
     }
     
-    response = httpx.post(f"{BASE_URL}/analyze", json=customer_data)
+    response = await client.post("/analyze", json=customer_data)
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    result = response.json()
+    if DEBUG:
+        print(f"Response: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
     assert response.status_code == 200
     
-    result = response.json()
     assert "customer_id" in result
     assert "recommended_reward" in result
     assert "predicted_retention" in result
     print("✅ Analyze endpoint passed!")
 
-def test_cache():
+async def check_cache(client):
     print("\n" + "="*50)
     print("Testing Cache Functionality...")
     print("="*50)
@@ -58,14 +99,13 @@ def test_cache():
     }
     
     # First request (should not be cached)
-    response1 = httpx.post(f"{BASE_URL}/analyze", json=customer_data)
+    response1 = await client.post("/analyze", json=customer_data)
     result1 = response1.json()
     print(f"First Request - Customer: {result1.get('customer_id')}")
     print(f"First Request - Retention: {result1.get('predicted_retention')}")
     
     # Second request (should be cached)
-    time.sleep(0.5)
-    response2 = httpx.post(f"{BASE_URL}/analyze", json=customer_data)
+    response2 = await client.post("/analyze", json=customer_data)
     result2 = response2.json()
     print(f"Second Request - Customer: {result2.get('customer_id')}")
     print(f"Second Request - Retention: {result2.get('predicted_retention')}")
@@ -73,18 +113,37 @@ def test_cache():
     assert result1["customer_id"] == result2["customer_id"]
     print("✅ Cache test passed!")
 
-def test_registry():
+async def check_analyze_batch(client):
+    print("\n" + "="*50)
+    print("Testing Batch Analyze Endpoint...")
+    print("="*50)
+    
+    # One request body carries many customer IDs instead of one /analyze call each
+    customer_ids = [f"CUST{i:06d}" for i in range(1, 51)]
+    
+    response = await client.post("/analyze_batch", json={"customer_ids": customer_ids})
+    print(f"Status Code: {response.status_code}")
+    assert response.status_code == 200
+    
+    result = response.json()
+    print(f"Results: {result['count']}")
+    assert len(result["results"]) == 50
+    assert [r["customer_id"] for r in result["results"]] == customer_ids
+    print("✅ Batch analyze endpoint passed!")
+
+async def check_registry(client):
     print("\n" + "="*50)
     print("Testing Root/Registry Info Endpoint...")
     print("="*50)
     
     # Test root endpoint which provides API info
-    response = httpx.get(f"{BASE_URL}/")
+    response = await client.get("/")
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    result = response.json()
+    if DEBUG:
+        print(f"Response: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
     assert response.status_code == 200
     
-    result = response.json()
     assert "message" in result or "version" in result
     print("✅ Root endpoint passed!")
     
@@ -94,30 +153,56 @@ def test_registry():
         "supervisor_url": "http://supervisor.example.com:9000",
         "agent_metadata": {"test": "true"}
     }
-    response = httpx.post(f"{BASE_URL}/register", json=register_data)
+    response = await client.post("/register", json=register_data)
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if DEBUG:
+        print(f"Response: {orjson.dumps(response.json(), option=orjson.OPT_INDENT_2).decode()}")
     assert response.status_code == 200
     print("✅ Register endpoint passed!")
 
+# Synchronous entry points for pytest; each runs its check on the shared loop and client
+def test_health():
+    LOOP.run_until_complete(check_health(CLIENT))
+
+def test_metrics():
+    LOOP.run_until_complete(check_metrics(CLIENT))
+
+def test_analyze():
+    LOOP.run_until_complete(check_analyze(CLIENT))
+
+def test_cache():
+    LOOP.run_until_complete(check_cache(CLIENT))
+
+def test_analyze_batch():
+    LOOP.run_until_complete(check_analyze_batch(CLIENT))
+
+def test_registry():
+    LOOP.run_until_complete(check_registry(CLIENT))
+
+async def run_checks():
+    """Run the independent endpoint checks concurrently"""
+    await asyncio.gather(
+        check_health(CLIENT),
+        check_metrics(CLIENT),
+        check_analyze(CLIENT),
+        check_cache(CLIENT),
+        check_analyze_batch(CLIENT),
+        check_registry(CLIENT)
+    )
+
 if __name__ == "__main__":
     print("\n🚀 Starting API Tests...")
-    print("Make sure the API server is running on http://127.0.0.1:8000")
-    print("\nWaiting 2 seconds for server to be ready...")
-    time.sleep(2)
+    print(f"Make sure the API server is running on {BASE_URL}")
     
     try:
-        test_health()
-        test_metrics()
-        test_analyze()
-        test_cache()
-        test_registry()
+        wait_ready()
+        LOOP.run_until_complete(run_checks())
         
         print("\n" + "="*50)
         print("🎉 ALL TESTS PASSED!")
         print("="*50)
         
-    except httpx.ConnectError:
+    except (httpx.ConnectError, RuntimeError):
         print("\n❌ ERROR: Cannot connect to API server!")
         print("Make sure the server is running with:")
         print("  python run_api.py")
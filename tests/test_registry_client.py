@@ -0,0 +1,403 @@
+"""
+Unit tests for the Registry Client (Supervisor-Worker communication)
+"""
+
+import sys
+import os
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.registry_client import RegistryClient
+from src.registry_transport import shared_session
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = str(self._payload)
+
+    def json(self):
+        return self._payload
+
+
+def make_registered_client():
+    """Create a client that behaves as if registration already succeeded"""
+    client = RegistryClient(agent_id="loyalty_agent_test")
+    client.is_registered = True
+    client.supervisor_url = "http://supervisor.invalid:9000"
+    return client
+
+
+class FakeHeartbeatConnection:
+    """Stand-in for HeartbeatConnection that replays scripted results"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+
+    def send(self, body):
+        self.sent.append(body)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        pass
+
+
+class TestCircuitBreaker:
+    """Test suite for the supervisor circuit breaker"""
+
+    def test_breaker_opens_after_consecutive_failures(self, monkeypatch):
+        """Heartbeats fast-fail without network calls once the breaker trips"""
+        register_calls = []
+
+        def failing_post(*args, **kwargs):
+            register_calls.append(args)
+            raise requests.exceptions.ConnectionError("supervisor down")
+
+        client = make_registered_client()
+        client._hb_conn = FakeHeartbeatConnection([ConnectionRefusedError("supervisor down")])
+        monkeypatch.setattr(client._session, "post", failing_post)
+
+        for _ in range(5):
+            assert client.send_heartbeat() is False
+        assert len(client._hb_conn.sent) == 5, f"Expected 5 attempts, got {len(client._hb_conn.sent)}"
+
+        # Breaker is open: no further network attempts
+        assert client.send_heartbeat() is False
+        assert client.register("http://supervisor.invalid:9000") is False
+        assert len(client._hb_conn.sent) == 5, "Breaker should fast-fail while open"
+        assert register_calls == [], "Registration should fast-fail while open"
+
+        print("✓ Circuit breaker open test passed")
+
+    def test_breaker_resets_on_success(self):
+        """A successful heartbeat clears the failure count"""
+        client = make_registered_client()
+        client._hb_conn = FakeHeartbeatConnection([TimeoutError("slow"), 200])
+
+        assert client.send_heartbeat() is False
+        assert client._breaker.fails == 1
+        assert client.send_heartbeat() is True
+        assert (client._breaker.fails, client._breaker.open_until) == (0, 0.0)
+
+        print("✓ Circuit breaker reset test passed")
+
+
+def serve_heartbeats(connections, bodies):
+    """Start a keep-alive heartbeat server recording each connection and request body"""
+
+    class HeartbeatHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            bodies.append((self.path, self.headers["Content-Type"], self.rfile.read(length)))
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HeartbeatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestHeartbeatConnection:
+    """Test suite for the persistent heartbeat connection"""
+
+    def test_heartbeats_reuse_one_socket(self):
+        """Consecutive heartbeats travel over a single kept-alive connection"""
+        connections = []
+        bodies = []
+        server = serve_heartbeats(connections, bodies)
+        try:
+            client = make_registered_client()
+            client.supervisor_url = f"http://127.0.0.1:{server.server_port}"
+
+            for _ in range(3):
+                assert client.send_heartbeat() is True
+        finally:
+            client._hb_conn.close()
+            server.shutdown()
+            server.server_close()
+
+        assert len(connections) == 1, f"Expected 1 connection, got {len(connections)}"
+        assert len(bodies) == 3
+        path, content_type, body = bodies[0]
+        assert path == "/heartbeat"
+        assert content_type == "application/json"
+        assert json.loads(body)["agent_id"] == "loyalty_agent_test"
+
+        print("✓ Heartbeat keep-alive test passed")
+
+    def test_unregister_stops_reconnects(self, monkeypatch):
+        """A heartbeat still in flight after unregister cannot reopen the connection"""
+        connections = []
+        server = serve_heartbeats(connections, [])
+        try:
+            client = make_registered_client()
+            client.supervisor_url = f"http://127.0.0.1:{server.server_port}"
+            assert client.send_heartbeat() is True
+
+            monkeypatch.setattr(client._session, "delete", lambda *args, **kwargs: FakeResponse(500))
+            assert client.unregister() is False
+
+            # Still registered after the failed DELETE, as a racing tick would see it
+            assert client.send_heartbeat() is False
+            assert client._hb_conn._sock is None
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert len(connections) == 1, f"Expected 1 connection, got {len(connections)}"
+
+        print("✓ Heartbeat shutdown test passed")
+
+
+class TestSession:
+    """Test suite for the pooled supervisor session"""
+
+    def test_session_retries_transient_failures(self):
+        """The mounted adapter retries connect errors and gateway failures"""
+        client = RegistryClient(agent_id="loyalty_agent_test")
+
+        for prefix in ("http://", "https://"):
+            retry = client._session.get_adapter(prefix + "supervisor.invalid").max_retries
+            assert retry.total == 3
+            assert retry.connect == 3
+            assert set(retry.status_forcelist) == {502, 503, 504}
+
+        print("✓ Session retry configuration test passed")
+
+
+class TestHeartbeatEncoding:
+    """Test suite for heartbeat wire formats"""
+
+    def test_json_heartbeat_is_compact(self):
+        """JSON heartbeats keep the existing keys without whitespace"""
+        client = RegistryClient(agent_id="loyalty_agent_test")
+        body, content_type = client._encode_heartbeat()
+
+        assert content_type == "application/json"
+        assert b" " not in body
+        payload = json.loads(body)
+        assert payload["agent_id"] == "loyalty_agent_test"
+        assert payload["status"] == "active"
+
+        print("✓ JSON heartbeat encoding test passed")
+
+    def test_msgpack_heartbeat(self):
+        """msgpack heartbeats use short keys when msgpack is available"""
+        msgpack = pytest.importorskip("msgpack")
+        client = RegistryClient(agent_id="loyalty_agent_test", heartbeat_format="msgpack")
+        body, content_type = client._encode_heartbeat()
+
+        assert content_type == "application/msgpack"
+        payload = msgpack.unpackb(body)
+        assert payload["i"] == "loyalty_agent_test"
+        assert payload["s"] == 1
+
+        print("✓ msgpack heartbeat encoding test passed")
+
+
+class TestSharedTransport:
+    """Test suite for process-wide sessions and heartbeat scheduling"""
+
+    def test_clients_share_session_per_supervisor(self):
+        """Clients talking to the same supervisor reuse one pooled session"""
+        first = make_registered_client()
+        second = make_registered_client()
+        assert first._session is second._session
+
+        second.supervisor_url = "http://other-supervisor.invalid:9000"
+        assert first._session is not second._session
+
+        print("✓ Shared session test passed")
+
+    def test_heartbeats_run_on_one_scheduler_thread(self, monkeypatch):
+        """All clients' heartbeats are driven by the single scheduler thread"""
+        sent = []
+        clients = [make_registered_client() for _ in range(3)]
+        for index, client in enumerate(clients):
+            client.agent_id = f"loyalty_agent_{index}"
+            client.heartbeat_interval = 0.05
+            monkeypatch.setattr(
+                client, "send_heartbeat",
+                lambda client=client: sent.append((client.agent_id, threading.current_thread().name))
+            )
+
+        # A slow client keeps its own interval instead of the fastest one
+        clients[2].heartbeat_interval = 60
+
+        for client in clients:
+            client.start_heartbeat()
+            assert client.get_status()["heartbeat_active"] is True
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and sum(agent == "loyalty_agent_0" for agent, _ in sent) < 3:
+            time.sleep(0.01)
+
+        for client in clients:
+            client.stop_heartbeat()
+            assert client.get_status()["heartbeat_active"] is False
+
+        assert {agent for agent, _ in sent} == {client.agent_id for client in clients}
+        assert {thread for _, thread in sent} == {"registry-heartbeat"}
+        assert sum(agent == "loyalty_agent_2" for agent, _ in sent) == 1
+
+        print("✓ Shared heartbeat scheduler test passed")
+
+    def test_failing_heartbeat_does_not_stop_scheduler(self, monkeypatch):
+        """A client whose heartbeat raises keeps rescheduling and never stalls the others"""
+        sent = []
+        healthy, faulty = make_registered_client(), make_registered_client()
+        healthy.agent_id, faulty.agent_id = "loyalty_agent_healthy", "loyalty_agent_faulty"
+
+        def failing_heartbeat():
+            sent.append("faulty")
+            raise ValueError("unexpected heartbeat bug")
+
+        for client in (healthy, faulty):
+            client.heartbeat_interval = 0.05
+        monkeypatch.setattr(healthy, "send_heartbeat", lambda: sent.append("healthy"))
+        monkeypatch.setattr(faulty, "send_heartbeat", failing_heartbeat)
+
+        faulty.start_heartbeat()
+        healthy.start_heartbeat()
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and min(sent.count("healthy"), sent.count("faulty")) < 3:
+            time.sleep(0.01)
+
+        for client in (healthy, faulty):
+            client.stop_heartbeat()
+
+        assert sent.count("healthy") >= 3
+        assert sent.count("faulty") >= 3, "Faulty client should keep rescheduling after an error"
+
+        print("✓ Failing heartbeat isolation test passed")
+
+
+class TestCallAgents:
+    """Test suite for concurrent inter-agent calls"""
+
+    def test_call_agents_overlaps_requests(self, monkeypatch):
+        """Targets are resolved with one discovery call and called concurrently"""
+        client = make_registered_client()
+        discovery_calls = []
+        agents = [
+            {"agent_id": "agent_a", "api_url": "http://agent-a.invalid"},
+            {"agent_id": "agent_b", "api_url": "http://agent-b.invalid"},
+        ]
+
+        def fake_discover(*args, **kwargs):
+            discovery_calls.append(args)
+            return agents
+
+        def slow_post(url, json=None, timeout=None):
+            time.sleep(0.2)
+            return FakeResponse(200, {"url": url, "echo": json})
+
+        monkeypatch.setattr(client, "discover_agents", fake_discover)
+        monkeypatch.setattr(client._session, "post", slow_post)
+
+        started = time.monotonic()
+        results = client.call_agents([
+            ("agent_a", "/analyze", {"customer_id": "CUST000001"}),
+            ("missing_agent", "/analyze", {}),
+            ("agent_b", "/analyze", {"customer_id": "CUST000002"}),
+        ])
+        elapsed = time.monotonic() - started
+
+        assert len(discovery_calls) == 1
+        assert results[0] == {"url": "http://agent-a.invalid/analyze", "echo": {"customer_id": "CUST000001"}}
+        assert results[1] is None
+        assert results[2]["url"] == "http://agent-b.invalid/analyze"
+        assert elapsed < 0.35, f"Calls did not overlap ({elapsed:.2f}s)"
+
+        print("✓ Concurrent agent call test passed")
+
+
+class TestUdpHeartbeat:
+    """Test suite for best-effort UDP heartbeats"""
+
+    def test_udp_heartbeat_sends_datagram(self, monkeypatch):
+        """With a UDP port configured, heartbeats are single datagrams"""
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(2)
+        port = receiver.getsockname()[1]
+
+        client = RegistryClient(agent_id="loyalty_agent_test", udp_heartbeat_port=port)
+        monkeypatch.setattr(shared_session("http://127.0.0.1:9000"), "post",
+                            lambda *args, **kwargs: FakeResponse(201))
+        monkeypatch.setattr(client, "start_heartbeat", lambda: None)
+
+        try:
+            assert client.register("http://127.0.0.1:9000") is True
+            assert client._hb_dest == ("127.0.0.1", port)
+            assert client.send_heartbeat() is True
+
+            datagram, _ = receiver.recvfrom(1024)
+            assert json.loads(datagram)["agent_id"] == "loyalty_agent_test"
+        finally:
+            client._hb_sock.close()
+            receiver.close()
+
+        print("✓ UDP heartbeat test passed")
+
+    def test_tcp_used_without_udp_port(self):
+        """Without a UDP port no datagram socket is opened"""
+        client = make_registered_client()
+        client._hb_conn = FakeHeartbeatConnection([200])
+
+        assert client.send_heartbeat() is True
+        assert client._hb_sock is None
+        assert len(client._hb_conn.sent) == 1
+
+        print("✓ TCP heartbeat fallback test passed")
+
+
+class TestUnexpectedErrors:
+    """Test suite for non-network errors in supervisor calls"""
+
+    def test_discovery_with_non_dict_body_returns_empty(self, monkeypatch):
+        """A malformed discovery body is logged and reported as no agents"""
+        client = make_registered_client()
+        monkeypatch.setattr(client._session, "get", lambda *args, **kwargs: FakeResponse(200, ["not", "a", "dict"]))
+
+        assert client.discover_agents() == []
+
+        print("✓ Malformed discovery body test passed")
+
+    def test_heartbeat_with_invalid_port_returns_false(self):
+        """An unparsable supervisor URL fails the heartbeat instead of raising"""
+        client = make_registered_client()
+        client.supervisor_url = "http://supervisor.invalid:notaport"
+
+        assert client.send_heartbeat() is False
+        assert client._breaker.fails == 1
+
+        print("✓ Invalid supervisor URL heartbeat test passed")